@@ -42,10 +42,25 @@ def main():
                     chess_board.selected_pos = (row, col)
                     chess_board.valid_moves = chess_board.get_valid_moves(row, col)
             
-            # Add ability to restart game with spacebar when game is over
-            elif event.type == pygame.KEYDOWN and chess_board.game_over:
-                if event.key == pygame.K_SPACE:
+            elif event.type == pygame.KEYDOWN:
+                # Add ability to restart game with spacebar when game is over
+                if event.key == pygame.K_SPACE and chess_board.game_over:
                     chess_board = ChessBoard()  # Reset the game
+                # Step through the game a move pair at a time, so play always
+                # resumes on white's turn (nothing would prompt the AI to
+                # move), or jump to either end
+                elif event.key == pygame.K_LEFT:
+                    chess_board.takeback()
+                elif event.key == pygame.K_RIGHT:
+                    while chess_board.redo_move() and chess_board.current_turn != 'white':
+                        pass
+                elif event.key == pygame.K_HOME:
+                    chess_board.goto_ply(0)
+                elif event.key == pygame.K_END:
+                    chess_board.goto_ply(len(chess_board.history))
+                # Take back the last move pair and play on from there
+                elif event.key == pygame.K_BACKSPACE:
+                    chess_board.takeback()
 
         # Draw the board
         ui.draw_board(chess_board)
@@ -1,87 +1,424 @@
+import json
 import random
+import time
+from collections import namedtuple
+from .search_stats import SearchStats, timed
+from .zobrist import hash_board, is_repetition, PAWN_KEYS
+from .pawn_structure import PawnHashTable, evaluate_pawns, pawn_shield
+from .bitbase import default_bitbases, bitbase_score
+from .search_cache import default_cache, CACHE_MIN_DEPTH
 from .constants import *
 
+SearchResult = namedtuple('SearchResult', 'move score depth stats')
+PVLine = namedtuple('PVLine', 'move score pv')
+
+# Transposition table bounds: the stored score is exact, a lower bound
+# (the node failed high) or an upper bound (it failed low)
+EXACT, LOWER, UPPER = 0, 1, 2
+
 class ChessAI:
-    def __init__(self, color):
+    def __init__(self, color, weights_path=None, cache=None, bitbases=None):
         self.color = color
         self.opponent_color = 'white' if color == 'black' else 'black'
+        self.piece_values = PIECE_VALUES
+        self.position_tables = PIECE_SQUARE_TABLES
+        self.pawn_weights = PAWN_STRUCTURE_WEIGHTS
+        # Pawn-structure terms are off by default so scores stay those of
+        # BatchEvaluator and the tuner. When on, they are cached per pawn
+        # structure in pawn_table; set it to None to evaluate them at every leaf
+        self.pawn_structure = False
+        self.pawn_table = PawnHashTable()
+        self.stats = SearchStats()
+        self.last_stats = None
+        self.position_history = []
+        # Optional context manager wrapped around every search (see search_stats)
+        self.profile_hook = None
+        # Persistent SearchCache shared across games and processes, if any
+        self.cache = cache if cache is not None else default_cache()
+        # Endgame bitbases giving exact results in the endings they cover
+        self.bitbases = bitbases if bitbases is not None else default_bitbases()
+        self._hint_move = None
+        # Transposition table for the current search: key -> (depth, score, bound, best move)
+        self.tt = {}
+        if weights_path:
+            self.load_weights(weights_path)
+
+    def load_weights(self, path):
+        """Load piece values and position tables from a JSON weights file.
 
+        The file holds "piece_values", "tables" and "pawn_structure" objects
+        shaped like PIECE_VALUES, PIECE_SQUARE_TABLES and
+        PAWN_STRUCTURE_WEIGHTS; missing entries keep their defaults. A
+        "pawn_structure" object also switches the pawn-structure terms on.
+        """
+        with open(path) as f:
+            weights = json.load(f)
+        self.piece_values = {**PIECE_VALUES, **weights.get('piece_values', {})}
+        self.position_tables = {**PIECE_SQUARE_TABLES, **weights.get('tables', {})}
+        self.pawn_weights = {**PAWN_STRUCTURE_WEIGHTS, **weights.get('pawn_structure', {})}
+        if 'pawn_structure' in weights:
+            self.pawn_structure = True
+        if self.pawn_table:
+            self.pawn_table = PawnHashTable()
+
+    @timed('eval')
     def evaluate_position(self, board):
+        if self.bitbases is not None:
+            exact = self._probe_bitbases(board)
+            if exact is not None:
+                return exact
+
         score = 0
+        pawn_terms = self.pawn_structure
+        pawn_key = 0
+        kings = {}
         for row in range(8):
             for col in range(8):
                 piece = board.board[row][col]
                 if piece:
-                    value = PIECE_VALUES[piece.piece_type]
+                    value = self.piece_values[piece.piece_type]
                     position_bonus = self.get_position_bonus(piece, row, col)
                     if piece.color == self.color:
                         score += value + position_bonus
                     else:
                         score -= value + position_bonus
+                    if pawn_terms:
+                        if piece.piece_type == 'pawn':
+                            pawn_key ^= PAWN_KEYS[piece.color][row * 8 + col]
+                        elif piece.piece_type == 'king':
+                            kings[piece.color] = (row, col)
+        if pawn_terms:
+            score += self._pawn_score(board, pawn_key, kings)
         return score
 
+    def _pawn_score(self, board, pawn_key, kings):
+        """Pawn-structure and king-shield terms, looked up by pawn key when cached"""
+        entry = self.pawn_table.probe(pawn_key) if self.pawn_table else None
+        if entry is None:
+            entry = evaluate_pawns(board.board, self.pawn_weights)
+            if self.pawn_table:
+                self.pawn_table.store(pawn_key, entry)
+        score, white_pawns, black_pawns = entry
+        # The shield depends on where the kings stand, so it is not cached
+        score += (pawn_shield(kings.get('white'), 'white', white_pawns, self.pawn_weights) -
+                  pawn_shield(kings.get('black'), 'black', black_pawns, self.pawn_weights))
+        return score if self.color == 'white' else -score
+
     def get_position_bonus(self, piece, row, col):
         if piece.color == 'black':
             row = 7 - row
-            
-        if piece.piece_type == 'pawn':
-            return PAWN_TABLE[row][col]
-        elif piece.piece_type == 'knight':
-            return KNIGHT_TABLE[row][col]
-        elif piece.piece_type == 'bishop':
-            return BISHOP_TABLE[row][col]
-        elif piece.piece_type == 'rook':
-            return ROOK_TABLE[row][col]
-        elif piece.piece_type == 'queen':
-            return QUEEN_TABLE[row][col]
+
+        table = self.position_tables.get(piece.piece_type)
+        if table:
+            return table[row][col]
         return 0
 
+    def _probe_bitbases(self, board):
+        """Exact score from the bitbases for our side, or None outside them"""
+        result = self.bitbases.probe(board)
+        if result is None:
+            return None
+        score = bitbase_score(*result)
+        return score if board.current_turn == self.color else -score
+
     def minimax(self, board, depth, alpha, beta, maximizing_player):
+        self.stats.nodes += 1
         if depth == 0:
             return self.evaluate_position(board)
+        if self.bitbases is not None:
+            exact = self._probe_bitbases(board)
+            if exact is not None:
+                self.stats.bitbase_hits += 1
+                return exact
+
+        # _search_child pushed this position's key before calling in
+        key = self.position_history[-1]
+        self.stats.tt_probes += 1
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry:
+            self.stats.tt_hits += 1
+            entry_depth, value, bound, tt_move = entry
+            if entry_depth >= depth and (bound == EXACT or
+                                         (bound == LOWER and value >= beta) or
+                                         (bound == UPPER and value <= alpha)):
+                return value
+        original_alpha, original_beta = alpha, beta
+
+        color = self.color if maximizing_player else self.opponent_color
+        moves = self.get_all_moves(board, color)
+        self.stats.expanded_nodes += 1
+        self.stats.moves_generated += len(moves)
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
 
+        best_move = None
         if maximizing_player:
             max_eval = float('-inf')
-            for move in self.get_all_moves(board, self.color):
-                new_board = self.simulate_move(board, move)
-                eval = self.minimax(new_board, depth - 1, alpha, beta, False)
-                max_eval = max(max_eval, eval)
+            for index, move in enumerate(moves):
+                eval = self._search_child(board, move, depth - 1, alpha, beta, False)
+                if eval > max_eval:
+                    max_eval, best_move = eval, move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
+                    self._record_cutoff(index)
                     break
-            return max_eval
+            best_value = max_eval
         else:
             min_eval = float('inf')
-            for move in self.get_all_moves(board, self.opponent_color):
-                new_board = self.simulate_move(board, move)
-                eval = self.minimax(new_board, depth - 1, alpha, beta, True)
-                min_eval = min(min_eval, eval)
+            for index, move in enumerate(moves):
+                eval = self._search_child(board, move, depth - 1, alpha, beta, True)
+                if eval < min_eval:
+                    min_eval, best_move = eval, move
                 beta = min(beta, eval)
                 if beta <= alpha:
+                    self._record_cutoff(index)
                     break
-            return min_eval
+            best_value = min_eval
+
+        if original_alpha >= original_beta:
+            # Entered with an empty window the result is only a bound, and
+            # which one is ambiguous; keep it out of the table
+            return best_value
+        if best_value <= original_alpha:
+            bound = UPPER
+        elif best_value >= original_beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt[key] = (depth, best_value, bound, best_move)
+        return best_value
+
+    def _search_child(self, board, move, depth, alpha, beta, maximizing_player):
+        """Make a move on a copy, score it and pop it off the hash history again.
+
+        Positions repeating one already on the history stack, or reached after
+        fifty moves without a pawn move or capture, are scored as draws
+        without searching their subtree.
+        """
+        new_board = self.simulate_move(board, move)
+        self.position_history.append(hash_board(new_board))
+        try:
+            if (new_board.halfmove_clock >= 100 or
+                is_repetition(self.position_history, new_board.halfmove_clock, 2)):
+                self.stats.nodes += 1
+                self.stats.draw_cutoffs += 1
+                return 0
+            return self.minimax(new_board, depth, alpha, beta, maximizing_player)
+        finally:
+            self.position_history.pop()
+
+    def _record_cutoff(self, index):
+        self.stats.beta_cutoffs += 1
+        if index == 0:
+            self.stats.first_move_cutoffs += 1
+
+    def get_best_move(self, board, depth=None, time_limit=None):
+        return self.search(board, depth, time_limit).move
+
+    def search(self, board, depth=None, time_limit=None):
+        """Search the position and return a SearchResult.
+
+        Without a time limit the search runs straight to the requested depth.
+        With one, it deepens iteratively and keeps the result of the last
+        completed iteration once the deadline passes. Statistics for the
+        search are attached to the result and kept in last_stats.
+
+        With a persistent cache, a stored result at least as deep as the one
+        asked for is returned without searching and a shallower one orders
+        the root moves. Results of CACHE_MIN_DEPTH or deeper are written back
+        unless a repetition or fifty-move draw was scored on the way.
+        """
+        if depth is None:
+            depth = AI_DEPTH
+        self._start_search(board)
+        key = self._cache_key(board, depth)
+        self.stats.start()
+        try:
+            exact = self._bitbase_root(board, depth) if self.bitbases is not None else None
+            cached = self._probe_cache(board, key) if key is not None and not exact else None
+            self._hint_move = cached[2] if cached else None
+            if exact:
+                result = exact
+            elif cached and cached[0] >= depth:
+                self.stats.cache_hit = True
+                result = (cached[2], cached[1], cached[0])
+            elif self.profile_hook:
+                with self.profile_hook:
+                    result = self._iterate(board, depth, time_limit)
+            else:
+                result = self._iterate(board, depth, time_limit)
+        finally:
+            self.stats.stop()
+        self._finish_search()
+        if (key is not None and not self.stats.cache_hit and result[0] is not None and
+                result[2] >= CACHE_MIN_DEPTH and not self.stats.draw_cutoffs):
+            self.cache.store(key, result[2], result[1], result[0])
+        self.stats.depth = result[2]
+        return SearchResult(*result, self.stats)
 
-    def get_best_move(self, board):
+    def _start_search(self, board):
+        self.stats = SearchStats()
+        self.tt = {}
+        # Only positions since the last irreversible move can ever repeat
+        self.position_history = board.position_history[-(board.halfmove_clock + 1):]
+        if not self.position_history:
+            self.position_history = [hash_board(board)]
+        self._pawn_counts = (self.pawn_table.probes, self.pawn_table.hits) if self.pawn_table else (0, 0)
+
+    def _finish_search(self):
+        if self.pawn_table:
+            self.stats.pawn_probes = self.pawn_table.probes - self._pawn_counts[0]
+            self.stats.pawn_hits = self.pawn_table.hits - self._pawn_counts[1]
+        self.last_stats = self.stats
+
+    def search_multipv(self, board, lines=3, depth=None):
+        """Return the best `lines` root moves as a ranked list of PVLine(move, score, pv).
+
+        Each pass searches the root again without the moves already found.
+        The transposition table is kept across passes, so later passes mostly
+        reuse the subtrees scored by earlier ones and cost far less than a
+        fresh search. Statistics for all passes are kept in last_stats.
+        """
+        if depth is None:
+            depth = AI_DEPTH
+        self._start_search(board)
+        self._hint_move = None
+        results = []
+        excluded = set()
+        self.stats.start()
+        try:
+            for _ in range(lines):
+                move, score = self._search_root(board, depth, excluded=excluded)
+                if move is None:
+                    break
+                excluded.add(move)
+                results.append(PVLine(move, score, self._principal_variation(board, move, depth)))
+        finally:
+            self.stats.stop()
+        self._finish_search()
+        self.stats.depth = depth
+        return results
+
+    def _principal_variation(self, board, move, depth):
+        """Follow best moves stored in the transposition table from a root move"""
+        pv = [move]
+        current = self.simulate_move(board, move)
+        seen = {hash_board(board)}
+        while len(pv) < depth:
+            key = hash_board(current)
+            entry = self.tt.get(key)
+            if not entry or entry[3] is None or key in seen:
+                break
+            seen.add(key)
+            if entry[3] not in self.get_all_moves(current, current.current_turn):
+                break
+            pv.append(entry[3])
+            current = self.simulate_move(current, entry[3])
+        return pv
+
+    def _bitbase_root(self, board, depth):
+        """Pick the move with the best bitbase result when the position is covered.
+
+        Winning, the quickest mate is chosen; losing, the slowest.
+        """
+        if board.current_turn != self.color or self.bitbases.probe(board) is None:
+            return None
+        best_move = None
+        best_value = float('-inf')
+        for move in board.get_status().moves():
+            child = self.simulate_move(board, move)
+            self.stats.nodes += 1
+            value = self._probe_bitbases(child)
+            if value is None:
+                return None
+            self.stats.bitbase_hits += 1
+            if value > best_value:
+                best_move, best_value = move, value
+        if best_move is None:
+            return None
+        return best_move, best_value, depth
+
+    def _cache_key(self, board, depth):
+        """Persistent cache key for the root, or None when the game path could change the result.
+
+        The cache is keyed by position alone, so it is skipped once a position
+        has repeated since the last pawn move or capture, or when the
+        fifty-move rule could end the game within the search.
+        """
+        if not self.cache or board.current_turn != self.color:
+            return None
+        history = self.position_history
+        if board.halfmove_clock + depth >= 100 or len(set(history)) < len(history):
+            return None
+        return history[-1]
+
+    def _probe_cache(self, board, key):
+        """Look up the persistent cache, ignoring entries whose move is not legal here"""
+        cached = self.cache.probe(key)
+        if cached and cached[2] in board.get_status().moves():
+            return cached
+        return None
+
+    def _iterate(self, board, depth, time_limit):
+        if time_limit is None:
+            best_move, best_value = self._search_root(board, depth)
+            return best_move, best_value, depth
+
+        deadline = time.time() + time_limit
+        result = (None, float('-inf'), 0)
+        for current_depth in range(1, depth + 1):
+            best_move, best_value = self._search_root(board, current_depth, deadline)
+            if best_move is None:
+                break
+            result = (best_move, best_value, current_depth)
+            if time.time() >= deadline:
+                break
+        return result
+
+    def _search_root(self, board, depth, deadline=None, excluded=()):
         best_move = None
         best_value = float('-inf')
         alpha = float('-inf')
         beta = float('inf')
         
-        possible_moves = self.get_all_moves(board, self.color)
+        # The real board caches its legal moves for the side to move
+        if board.current_turn == self.color:
+            possible_moves = board.get_status().moves()
+        else:
+            possible_moves = self.get_all_moves(board, self.color)
+        if excluded:
+            possible_moves = [move for move in possible_moves if move not in excluded]
         random.shuffle(possible_moves)
+        if self._hint_move in possible_moves:
+            possible_moves.remove(self._hint_move)
+            possible_moves.insert(0, self._hint_move)
+        self.stats.nodes += 1
+        self.stats.expanded_nodes += 1
+        self.stats.moves_generated += len(possible_moves)
         
         for move in possible_moves:
-            new_board = self.simulate_move(board, move)
-            value = self.minimax(new_board, AI_DEPTH - 1, alpha, beta, False)
+            # An interrupted iteration is discarded, except at depth 1 where
+            # any legal move beats returning nothing
+            if deadline is not None and depth > 1 and time.time() >= deadline:
+                return None, float('-inf')
+
+            value = self._search_child(board, move, depth - 1, alpha, beta, False)
             
             if value > best_value:
                 best_value = value
                 best_move = move
+            if value == float('inf'):
+                # Nothing beats a mate, and the remaining moves would only be
+                # searched with an empty window
+                break
             
             alpha = max(alpha, value)
         
-        return best_move
+        return best_move, best_value
 
+    @timed('movegen')
     def get_all_moves(self, board, color):
         moves = []
         for row in range(8):
@@ -93,8 +430,20 @@ class ChessAI:
                         moves.append(((row, col), move))
         return moves
 
+    @timed('make')
     def simulate_move(self, board, move):
         new_board = board.copy()
         from_pos, to_pos = move
+        piece = board.board[from_pos[0]][from_pos[1]]
+        irreversible = piece.piece_type == 'pawn' or board.board[to_pos[0]][to_pos[1]] is not None
         new_board.move_piece(from_pos, to_pos, checking_future=True)
+
+        # move_piece leaves game state alone for future moves; keep the parts
+        # hashing and repetition detection depend on
+        new_board.current_turn = 'black' if piece.color == 'white' else 'white'
+        if piece.piece_type == 'pawn' and abs(to_pos[0] - from_pos[0]) == 2:
+            new_board.last_double_pawn = to_pos
+        else:
+            new_board.last_double_pawn = None
+        new_board.halfmove_clock = 0 if irreversible else board.halfmove_clock + 1
         return new_board
\ No newline at end of file
@@ -0,0 +1,253 @@
+import argparse
+import json
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .board import ChessBoard
+from .ai import ChessAI
+from .search_stats import make_profile_hook
+from .constants import *
+
+EPD_OPERATION = re.compile(r'\s*([A-Za-z][A-Za-z0-9_]*)\s*((?:"[^"]*"|[^;])*);')
+
+
+def parse_epd_line(line):
+    """Split an EPD line into (fen, operations).
+
+    The four position fields are completed into a full FEN using the hmvc and
+    fmvn operations when present.
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"Invalid EPD line: {line!r}")
+
+    operations = {}
+    if len(fields) == 5:
+        for opcode, operand in EPD_OPERATION.findall(fields[4]):
+            operations[opcode] = operand.strip().strip('"')
+
+    halfmove = operations.get('hmvc', '0')
+    fullmove = operations.get('fmvn', '1')
+    fen = ' '.join(fields[:4] + [halfmove, fullmove])
+    return fen, operations
+
+
+def read_epd(path, on_error=None):
+    """Yield (fen, operations) for each position in an EPD file, one line at a time.
+
+    A malformed line raises ValueError, unless on_error is given: it is then
+    called with the line number and the error, and the line is skipped.
+    """
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                try:
+                    entry = parse_epd_line(line)
+                except ValueError as e:
+                    if on_error is None:
+                        raise
+                    on_error(number, e)
+                    continue
+                yield entry
+
+
+def move_to_uci(move):
+    """Convert a ((row, col), (row, col)) move to coordinate notation (e.g. e2e4)"""
+    if move is None:
+        return None
+    (from_row, from_col), (to_row, to_col) = move
+    return ('abcdefgh'[from_col] + '87654321'[from_row] +
+            'abcdefgh'[to_col] + '87654321'[to_row])
+
+
+def uci_to_move(text):
+    """Parse coordinate notation into (from_pos, to_pos, promotion piece type or None)"""
+    if (len(text) not in (4, 5) or text[0] not in 'abcdefgh' or text[2] not in 'abcdefgh' or
+            text[1] not in '12345678' or text[3] not in '12345678' or
+            (len(text) == 5 and text[4] not in 'nbrq')):
+        raise ValueError(f"Invalid move: {text!r}")
+    from_pos = ('87654321'.index(text[1]), 'abcdefgh'.index(text[0]))
+    to_pos = ('87654321'.index(text[3]), 'abcdefgh'.index(text[2]))
+    promotion = FEN_PIECE_TYPES[text[4]] if len(text) == 5 else None
+    return from_pos, to_pos, promotion
+
+
+def analyze_position(fen, depth=AI_DEPTH, time_limit=None, position_id=None, profile_hook=None,
+                     multipv=1):
+    """Search a single FEN position and return the result as a dict.
+
+    With multipv > 1 the top lines are searched to a fixed depth (time_limit
+    is ignored) and listed under "lines" with their scores and PVs.
+    """
+    board = ChessBoard.from_fen(fen)
+    ai = ChessAI(board.current_turn)
+    ai.profile_hook = profile_hook
+
+    if multipv > 1:
+        lines = ai.search_multipv(board, multipv, depth)
+        stats = ai.last_stats
+        return {
+            'id': position_id,
+            'fen': fen,
+            'move': move_to_uci(lines[0].move) if lines else None,
+            'score': _clamp_score(lines[0].score) if lines else 0,
+            'depth': depth,
+            'time': round(stats.elapsed, 3),
+            'nodes': stats.nodes,
+            'nps': round(stats.nodes_per_second),
+            'lines': [{'move': move_to_uci(line.move), 'score': _clamp_score(line.score),
+                       'pv': [move_to_uci(move) for move in line.pv]} for line in lines]
+        }
+
+    result = ai.search(board, depth, time_limit)
+
+    return {
+        'id': position_id,
+        'fen': fen,
+        'move': move_to_uci(result.move),
+        'score': _clamp_score(result.score),
+        'depth': result.depth,
+        'time': round(result.stats.elapsed, 3),
+        'nodes': result.stats.nodes,
+        'nps': round(result.stats.nodes_per_second)
+    }
+
+
+def _clamp_score(score):
+    return int(max(-MAX_SCORE, min(MAX_SCORE, score)))
+
+
+class _AnalyzeTask:
+    """Picklable callable carrying the search settings to pool workers"""
+    def __init__(self, depth, time_limit, profile_hook=None, multipv=1):
+        self.depth = depth
+        self.time_limit = time_limit
+        self.profile_hook = profile_hook
+        self.multipv = multipv
+
+    def __call__(self, entry):
+        fen, operations = entry
+        try:
+            return analyze_position(fen, self.depth, self.time_limit, operations.get('id'),
+                                    self.profile_hook, self.multipv)
+        except ValueError as e:
+            # One bad position must not end a batch of thousands
+            return {'id': operations.get('id'), 'fen': fen, 'error': str(e)}
+
+
+def _bounded_map(executor, fn, entries, window, ordered):
+    """Map fn over entries with at most `window` tasks in flight.
+
+    Unlike Executor.map this never reads ahead of the window, so memory stays
+    constant however long the input is.
+    """
+    entries = iter(entries)
+
+    if ordered:
+        pending = deque()
+        for entry in entries:
+            pending.append(executor.submit(fn, entry))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+        return
+
+    pending = set()
+    for entry in entries:
+        pending.add(executor.submit(fn, entry))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def analyze_stream(entries, depth=AI_DEPTH, time_limit=None, workers=1, ordered=True, window=None,
+                   profile_hook=None, multipv=1):
+    """Analyze (fen, operations) entries lazily, yielding result dicts.
+
+    With workers > 1 positions are searched in a process pool; ordered=False
+    yields results as soon as they complete instead of in input order.
+    profile_hook only applies to in-process (workers=1) analysis.
+    """
+    if workers <= 1:
+        task = _AnalyzeTask(depth, time_limit, profile_hook, multipv)
+        for entry in entries:
+            yield task(entry)
+        return
+
+    task = _AnalyzeTask(depth, time_limit, multipv=multipv)
+    if window is None:
+        window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from _bounded_map(executor, task, entries, window, ordered)
+
+
+def analyze_epd(input_path, output, depth=AI_DEPTH, time_limit=None, workers=1, ordered=True,
+                profile_hook=None, multipv=1):
+    """Analyze every position in an EPD file, writing one JSON line per result.
+
+    Lines that do not parse are reported on stderr and skipped; positions
+    that cannot be set up get a record with an "error" field instead of a
+    move. Returns the number of records written.
+    """
+    def skip_line(number, error):
+        print(f"{input_path}:{number}: {error}", file=sys.stderr)
+
+    count = 0
+    results = analyze_stream(read_epd(input_path, skip_line), depth, time_limit, workers, ordered,
+                             profile_hook=profile_hook, multipv=multipv)
+    for result in results:
+        if 'error' in result:
+            print(f"{input_path}: {result['fen']}: {result['error']}", file=sys.stderr)
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-analyze EPD positions with ChessAI")
+    parser.add_argument('epd', help="input EPD file")
+    parser.add_argument('-o', '--output', help="output JSON-lines file (default: stdout)")
+    parser.add_argument('-d', '--depth', type=int, default=AI_DEPTH, help="search depth")
+    parser.add_argument('-t', '--time', type=float, default=None,
+                        help="time limit per position in seconds")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="worker processes")
+    parser.add_argument('--unordered', action='store_true',
+                        help="write results as they complete instead of in input order")
+    parser.add_argument('--multipv', type=int, default=1,
+                        help="number of best lines to report per position")
+    parser.add_argument('--profile', choices=['cprofile', 'sampling'],
+                        help="profile the searches (single process only)")
+    parser.add_argument('--profile-output', default='search.prof',
+                        help="profile dump path (cProfile stats or collapsed stacks)")
+    args = parser.parse_args(argv)
+
+    profile_hook = None
+    if args.profile:
+        if args.workers > 1:
+            parser.error("--profile requires --workers 1")
+        profile_hook = make_profile_hook(args.profile, args.profile_output)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        start = time.time()
+        count = analyze_epd(args.epd, output, args.depth, args.time, args.workers, not args.unordered,
+                            profile_hook, args.multipv)
+        elapsed = time.time() - start
+    finally:
+        if args.output:
+            output.close()
+    print(f"Analyzed {count} positions in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
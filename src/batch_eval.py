@@ -0,0 +1,77 @@
+import numpy as np
+from .packed import POSITION_DTYPE, unpack_squares
+from .constants import *
+
+# Flipping the row of a square index (row * 8 + col) mirrors it for black
+MIRROR_SQUARE = np.arange(64) ^ 56
+SQUARE_INDEX = np.arange(64, dtype=np.int32)
+BATCH_CHUNK = 16384
+
+
+def board_squares(board):
+    """Return a ChessBoard position as a (64,) int8 array of piece codes"""
+    squares = np.zeros(64, dtype=np.int8)
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece:
+                code = PIECE_CODES[piece.piece_type]
+                if piece.color == 'black':
+                    code |= BLACK_PIECE_FLAG
+                squares[row * 8 + col] = code
+    return squares
+
+
+def build_score_table(piece_values=PIECE_VALUES, tables=PIECE_SQUARE_TABLES):
+    """Build a (16, 64) lookup of white-relative scores indexed by piece code and square"""
+    score_table = np.zeros((16, 64), dtype=np.int32)
+    for piece_type, code in PIECE_CODES.items():
+        table = tables.get(piece_type)
+        bonus = np.asarray(table, dtype=np.int32).reshape(64) if table is not None else np.zeros(64, np.int32)
+        score_table[code] = piece_values[piece_type] + bonus
+        score_table[code | BLACK_PIECE_FLAG] = -(piece_values[piece_type] + bonus[MIRROR_SQUARE])
+    return score_table
+
+
+class BatchEvaluator:
+    """Vectorized material plus piece-square evaluation.
+
+    Scores match ChessAI.evaluate_position exactly for the same piece values
+    and tables.
+    """
+    def __init__(self, piece_values=PIECE_VALUES, tables=PIECE_SQUARE_TABLES):
+        self.score_table = build_score_table(piece_values, tables)
+        self._flat_table = self.score_table.reshape(-1)
+
+    def evaluate(self, positions, color='white'):
+        """Score positions from color's point of view.
+
+        positions is an (N, 64) array of piece codes or an array of packed
+        POSITION_DTYPE records. Returns an (N,) int32 array.
+        """
+        positions = np.asarray(positions)
+        if positions.dtype != POSITION_DTYPE:
+            positions = np.atleast_2d(positions)
+
+        # Work in fixed-size chunks so temporaries stay cache-sized
+        scores = np.empty(len(positions), dtype=np.int32)
+        for start in range(0, len(positions), BATCH_CHUNK):
+            chunk = positions[start:start + BATCH_CHUNK]
+            if chunk.dtype == POSITION_DTYPE:
+                chunk = unpack_squares(chunk)
+            # Index the flattened table by code * 64 + square in one gather
+            indices = chunk.astype(np.int32) * 64 + SQUARE_INDEX
+            np.take(self._flat_table, indices).sum(axis=1, dtype=np.int32,
+                                                   out=scores[start:start + BATCH_CHUNK])
+        return scores if color == 'white' else -scores
+
+
+_default_evaluator = None
+
+
+def evaluate_batch(positions, color='white'):
+    """Score positions with the default constants (see BatchEvaluator.evaluate)"""
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = BatchEvaluator()
+    return _default_evaluator.evaluate(positions, color)
@@ -0,0 +1,168 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from .board import ChessBoard
+from .ai import ChessAI
+from .analysis import move_to_uci
+from .search_stats import PROFILE_COUNTERS, TIMED_STAGES
+from .constants import *
+
+# Fixed positions searched by the benchmark; changing them changes the signature
+BENCH_POSITIONS = (
+    ('start', START_FEN),
+    ('italian', 'r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5'),
+    ('qgd', 'rnbqkb1r/ppp2ppp/4pn2/3p2B1/2PP4/2N5/PP2PPPP/R2QKBNR b KQkq - 3 4'),
+    ('sicilian', 'r1bqkb1r/pp2pppp/2np1n2/8/3NP3/2N5/PPP2PPP/R1BQKB1R w KQkq - 2 6'),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('middlegame', 'r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 4 10'),
+    ('rook ending', '8/5pk1/6p1/8/1r5P/6P1/5PK1/R7 w - - 0 40'),
+    ('minor ending', '8/4kp2/4p1p1/3nP3/5P2/4BK2/6PP/8 b - - 0 35'),
+    ('pawn ending', '8/8/3k4/2p1p3/2P1P3/3K4/8/8 w - - 0 50'),
+    ('queen ending', '6k1/5pp1/7p/8/8/6P1/5PKP/3q3Q w - - 0 45'),
+)
+
+BENCH_DEPTH = 3
+# Allowed fractional drop in nodes/sec before a comparison counts as a regression
+BENCH_TOLERANCE = 0.10
+BENCH_STAGE_TOLERANCE = 0.20
+BENCH_STAGES = TIMED_STAGES + ('search',)
+
+
+def bench_position(fen, depth=BENCH_DEPTH, repeat=1):
+    """Search one position with get_best_move, returning (move, stats) of the fastest run.
+
+    The root move shuffle is seeded and the persistent cache and bitbases are
+    switched off, so every run visits the same nodes.
+    """
+    best = None
+    for _ in range(repeat):
+        board = ChessBoard.from_fen(fen)
+        ai = ChessAI(board.current_turn)
+        ai.cache = None
+        ai.bitbases = None
+        random.seed(0)
+        move = ai.get_best_move(board, depth)
+        stats = ai.last_stats
+        if best and (move, stats.nodes) != (best[0], best[1].nodes):
+            raise RuntimeError(f"Search is not deterministic for {fen}")
+        if best is None or stats.elapsed < best[1].elapsed:
+            best = (move, stats)
+    return best
+
+
+def run_bench(positions=BENCH_POSITIONS, depth=BENCH_DEPTH, repeat=1, log=None):
+    """Benchmark every (name, fen) position and return the results as a dict.
+
+    "signature" hashes each position's best move and node count, so any
+    change in search behaviour changes it. "stages" gives nodes per second of
+    time spent in each stage ("search" is the remainder) and is only filled
+    in when CHESS_PROFILE_COUNTERS was set before import.
+    """
+    signature = hashlib.sha1()
+    results = []
+    nodes = 0
+    elapsed = 0.0
+    times = {stage: 0.0 for stage in TIMED_STAGES}
+    for name, fen in positions:
+        move, stats = bench_position(fen, depth, repeat)
+        signature.update(f"{fen} {move_to_uci(move)} {stats.nodes}\n".encode())
+        nodes += stats.nodes
+        elapsed += stats.elapsed
+        for stage in TIMED_STAGES:
+            times[stage] += stats.times[stage]
+        result = {'name': name, 'move': move_to_uci(move), 'nodes': stats.nodes,
+                  'time': round(stats.elapsed, 4),
+                  'nps': round(stats.nodes / stats.elapsed) if stats.elapsed else 0}
+        results.append(result)
+        if log:
+            log(f"{name:14} {result['move'] or '-':6} {stats.nodes:9} nodes "
+                f"{result['time']:8.3f}s {result['nps']:8} nps")
+
+    bench = {
+        'depth': depth,
+        'signature': signature.hexdigest()[:16],
+        'nodes': nodes,
+        'time': round(elapsed, 4),
+        'nps': round(nodes / elapsed) if elapsed else 0,
+        'positions': results
+    }
+    if PROFILE_COUNTERS:
+        times['search'] = elapsed - sum(times.values())
+        bench['stages'] = {stage: round(nodes / times[stage]) if times[stage] > 0 else 0
+                           for stage in BENCH_STAGES}
+    return bench
+
+
+def compare_bench(result, baseline, tolerance=BENCH_TOLERANCE, stage_tolerance=BENCH_STAGE_TOLERANCE):
+    """List the regressions of a run against a baseline (empty when it passes).
+
+    A different depth or signature means the search itself changed; nodes
+    per second overall and per stage may drop by at most the tolerances.
+    """
+    if result['depth'] != baseline['depth']:
+        return [f"depth {result['depth']} does not match baseline depth {baseline['depth']}"]
+
+    failures = []
+    if result['signature'] != baseline['signature']:
+        changed = [f"{new['name']} ({old['move']} {old['nodes']} -> {new['move']} {new['nodes']})"
+                   for new, old in zip(result['positions'], baseline['positions'])
+                   if (new['move'], new['nodes']) != (old['move'], old['nodes'])]
+        failures.append(f"signature {result['signature']} != {baseline['signature']}: "
+                        f"{', '.join(changed) or 'position set changed'}")
+
+    checks = [('nps', result['nps'], baseline['nps'], tolerance)]
+    if 'stages' in result and 'stages' in baseline:
+        checks += [(f"{stage} nps", result['stages'][stage], baseline['stages'][stage], stage_tolerance)
+                   for stage in BENCH_STAGES if baseline['stages'].get(stage)]
+    for label, value, expected, allowed in checks:
+        if value < expected * (1 - allowed):
+            failures.append(f"{label} {value} is {1 - value / expected:.1%} below baseline "
+                            f"{expected} (tolerance {allowed:.0%})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ChessAI on a fixed position set",
+        epilog="Per-stage rates need CHESS_PROFILE_COUNTERS=1 in the environment; "
+               "without it only totals are reported and compared.")
+    parser.add_argument('-d', '--depth', type=int, default=BENCH_DEPTH, help="search depth")
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+                        help="runs per position, keeping the fastest")
+    parser.add_argument('--save', metavar='PATH', help="write the results as a baseline")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=BENCH_TOLERANCE,
+                        help="allowed fractional drop in overall nodes/sec")
+    parser.add_argument('--stage-tolerance', type=float, default=BENCH_STAGE_TOLERANCE,
+                        help="allowed fractional drop in per-stage nodes/sec")
+    args = parser.parse_args(argv)
+
+    result = run_bench(depth=args.depth, repeat=args.repeat, log=print)
+    print(f"Total {result['nodes']} nodes in {result['time']:.2f}s ({result['nps']} nps) "
+          f"signature {result['signature']}")
+    if 'stages' in result:
+        print('Stage nps: ' + ' '.join(f"{stage}={nps}" for stage, nps in result['stages'].items()))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            parser.error(f"baseline not found: {args.baseline}")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare_bench(result, baseline, args.tolerance, args.stage_tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from .constants import *
+
+# A bitbase covers king and one piece against a lone king, with the piece's
+# side stored as white ("strong") and positions for black as the strong side
+# mirrored onto it. Positions are indexed per side to move as
+#   white king square * 4096 + black king square * 64 + piece square
+# with squares numbered row * 8 + col (row 0 is rank 8).
+#
+# File: 32-byte header, then 2-bit WDL codes for the 2 * POSITIONS positions
+# (white to move first), then one distance-to-mate byte (in plies) for each.
+BITBASE_HEADER = struct.Struct('<8s4sII12x')
+BITBASE_MAGIC = b'CHESSBB\x00'
+BITBASE_VERSION = 1
+POSITIONS = 64 * 64 * 64
+
+# WDL codes, from the point of view of the side to move
+DRAW, WIN, LOSS, ILLEGAL = 0, 1, 2, 3
+NO_DTM = 255
+
+# Material signatures, generated in this order since KPK promotes into KQK
+BITBASE_PIECES = {'KQK': 'queen', 'KRK': 'rook', 'KPK': 'pawn'}
+PIECE_MATERIAL = {piece_type: material for material, piece_type in BITBASE_PIECES.items()}
+
+# Scores for won positions are BITBASE_WIN minus the plies to mate
+BITBASE_WIN = 30000
+
+# Set to a directory of generated *.bb files to load them into every ChessAI
+BITBASE_PATH_ENV = 'CHESS_BITBASES'
+
+KING_TARGETS = [[(r, c) for r in range(row - 1, row + 2) for c in range(col - 1, col + 2)
+                 if 0 <= r < 8 and 0 <= c < 8 and (r, c) != (row, col)]
+                for row in range(8) for col in range(8)]
+KING_TARGETS = [[r * 8 + c for r, c in targets] for targets in KING_TARGETS]
+KING_ZONE = [frozenset(targets) for targets in KING_TARGETS]
+
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def _rays(square, directions, blockers):
+    """Squares reached from square along directions, stopping at (and including) blockers"""
+    row, col = divmod(square, 8)
+    squares = []
+    for d_row, d_col in directions:
+        r, c = row + d_row, col + d_col
+        while 0 <= r < 8 and 0 <= c < 8:
+            squares.append(r * 8 + c)
+            if r * 8 + c in blockers:
+                break
+            r, c = r + d_row, c + d_col
+    return squares
+
+
+def _piece_attacks(piece_type, square, white_king):
+    """Squares a white piece attacks; the black king never blocks (it cannot hide behind itself)"""
+    if piece_type == 'pawn':
+        row, col = divmod(square, 8)
+        return frozenset((row - 1) * 8 + c for c in (col - 1, col + 1) if 0 <= c < 8 and row > 0)
+    directions = QUEEN_DIRECTIONS if piece_type == 'queen' else ROOK_DIRECTIONS
+    return frozenset(_rays(square, directions, {white_king}))
+
+
+def _valid(piece_type, wk, bk, piece):
+    if wk == bk or wk == piece or bk == piece or bk in KING_ZONE[wk]:
+        return False
+    return piece_type != 'pawn' or 8 <= piece < 56
+
+
+def generate(piece_type, promotion_table=None):
+    """Retrograde analysis of K + piece vs K.
+
+    Returns (wtm, btm): lists of DTM in plies for every index, with -1 for
+    draws and None for illegal positions. A pawn promotes to a queen and its
+    positions then continue in promotion_table, the generated KQK.
+    """
+    attacks = {}
+
+    def attacked(wk, piece):
+        key = wk * 64 + piece
+        squares = attacks.get(key)
+        if squares is None:
+            squares = attacks[key] = _piece_attacks(piece_type, piece, wk)
+        return squares
+
+    wtm = [None] * POSITIONS
+    btm = [None] * POSITIONS
+    replies = bytearray(POSITIONS)
+    # buckets[d] holds (white to move, index) entries to be settled at d plies
+    buckets = [[]]
+
+    for wk in range(64):
+        for bk in range(64):
+            for piece in range(64):
+                if not _valid(piece_type, wk, bk, piece):
+                    continue
+                index = wk * 4096 + bk * 64 + piece
+                guarded = attacked(wk, piece)
+                btm[index] = -1
+                if bk not in guarded:
+                    wtm[index] = -1
+
+                # Black's legal replies; taking an unguarded piece is always one
+                count = 0
+                for target in KING_TARGETS[bk]:
+                    if target == piece:
+                        if target not in KING_ZONE[wk]:
+                            count += 1
+                    elif target not in KING_ZONE[wk] and target not in guarded:
+                        count += 1
+                replies[index] = count
+                if count == 0 and bk in guarded:
+                    buckets[0].append((False, index))
+
+    if piece_type == 'pawn':
+        # Promotions continue in the KQK table one ply later
+        for wk in range(64):
+            for bk in range(64):
+                for piece in range(8, 16):
+                    index = wk * 4096 + bk * 64 + piece
+                    queen = piece - 8
+                    if wtm[index] is None or queen in (wk, bk):
+                        continue
+                    after = promotion_table[wk * 4096 + bk * 64 + queen]
+                    if after is not None and after >= 0:
+                        while len(buckets) <= after + 1:
+                            buckets.append([])
+                        buckets[after + 1].append((True, index))
+
+    dtm = 0
+    while dtm < len(buckets):
+        for white_to_move, index in buckets[dtm]:
+            wk, rest = divmod(index, 4096)
+            bk, piece = divmod(rest, 64)
+            if white_to_move:
+                if wtm[index] != -1:
+                    continue
+                wtm[index] = dtm
+                # Black king moves that led here: one fewer escape for black
+                for origin in KING_TARGETS[bk]:
+                    if origin == piece or origin == wk or origin in KING_ZONE[wk]:
+                        continue
+                    previous = wk * 4096 + origin * 64 + piece
+                    if btm[previous] is None:
+                        continue
+                    replies[previous] -= 1
+                    if replies[previous] == 0:
+                        _push(buckets, dtm + 1, (False, previous))
+            else:
+                btm[index] = dtm
+                for previous in _white_unmoves(piece_type, wk, bk, piece):
+                    if wtm[previous] == -1:
+                        _push(buckets, dtm + 1, (True, previous))
+        dtm += 1
+    return wtm, btm
+
+
+def _push(buckets, dtm, entry):
+    while len(buckets) <= dtm:
+        buckets.append([])
+    buckets[dtm].append(entry)
+
+
+def _white_unmoves(piece_type, wk, bk, piece):
+    """Indexes of white-to-move positions one white move before (wk, bk, piece)"""
+    for origin in KING_TARGETS[wk]:
+        if origin != piece and origin != bk and origin not in KING_ZONE[bk]:
+            yield origin * 4096 + bk * 64 + piece
+
+    if piece_type == 'pawn':
+        origins = []
+        if piece + 8 < 56 and piece + 8 not in (wk, bk):
+            origins.append(piece + 8)
+            if 32 <= piece < 40 and piece + 16 not in (wk, bk):
+                origins.append(piece + 16)
+    else:
+        directions = QUEEN_DIRECTIONS if piece_type == 'queen' else ROOK_DIRECTIONS
+        origins = [square for square in _rays(piece, directions, {wk, bk})
+                   if square not in (wk, bk)]
+    for origin in origins:
+        yield wk * 4096 + bk * 64 + origin
+
+
+def write_bitbase(path, material, wtm, btm):
+    """Pack a generated table into a bitbase file"""
+    wdl = bytearray(2 * POSITIONS // 4)
+    dtm = bytearray([NO_DTM]) * (2 * POSITIONS)
+    for side, table in enumerate((wtm, btm)):
+        result = WIN if side == 0 else LOSS
+        for index, value in enumerate(table):
+            position = side * POSITIONS + index
+            if value is None:
+                code = ILLEGAL
+            elif value >= 0:
+                code = result
+                dtm[position] = min(value, NO_DTM - 1)
+            else:
+                code = DRAW
+            wdl[position >> 2] |= code << ((position & 3) * 2)
+    with open(path, 'wb') as f:
+        f.write(BITBASE_HEADER.pack(BITBASE_MAGIC, material.encode(), BITBASE_VERSION, POSITIONS))
+        f.write(wdl)
+        f.write(dtm)
+
+
+def generate_all(directory, log=None):
+    """Generate every bitbase into directory as <material>.bb"""
+    os.makedirs(directory, exist_ok=True)
+    tables = {}
+    for material, piece_type in BITBASE_PIECES.items():
+        start = time.time()
+        wtm, btm = generate(piece_type, tables.get('KQK', (None,))[1] if piece_type == 'pawn' else None)
+        tables[material] = (wtm, btm)
+        write_bitbase(os.path.join(directory, f"{material.lower()}.bb"), material, wtm, btm)
+        if log:
+            wins = sum(1 for value in wtm if value is not None and value >= 0)
+            legal = sum(1 for value in wtm if value is not None)
+            longest = max((value for value in wtm if value is not None), default=0)
+            print(f"{material}: {wins}/{legal} white-to-move wins, longest mate {longest} plies, "
+                  f"{time.time() - start:.1f}s", file=log)
+
+
+class Bitbase:
+    """One memory-mapped bitbase file"""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        magic, material, version, positions = BITBASE_HEADER.unpack(self.file.read(BITBASE_HEADER.size))
+        if magic != BITBASE_MAGIC or version != BITBASE_VERSION or positions != POSITIONS:
+            self.file.close()
+            raise ValueError(f"Not a bitbase file: {path}")
+        self.material = material.rstrip(b'\x00').decode()
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._dtm_offset = BITBASE_HEADER.size + 2 * POSITIONS // 4
+
+    def probe_index(self, white_to_move, index):
+        """Return (WDL code, plies to mate) for the side to move"""
+        position = index if white_to_move else POSITIONS + index
+        code = (self.map[BITBASE_HEADER.size + (position >> 2)] >> ((position & 3) * 2)) & 3
+        return code, self.map[self._dtm_offset + position]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class Bitbases:
+    """The bitbases found in a directory, probed by ChessBoard position"""
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}
+        for material in BITBASE_PIECES:
+            path = os.path.join(directory, f"{material.lower()}.bb")
+            if os.path.exists(path):
+                self.tables[material] = Bitbase(path)
+
+    def probe(self, board):
+        """Return (WDL code, plies to mate) for the side to move, or None if not covered.
+
+        A bare king against a bare king is reported as a draw.
+        """
+        pieces = []
+        grid = board.board
+        for row in range(8):
+            for col in range(8):
+                piece = grid[row][col]
+                if piece:
+                    if len(pieces) == 3:
+                        return None
+                    pieces.append((piece, row, col))
+        if len(pieces) == 2:
+            return DRAW, NO_DTM
+        if len(pieces) != 3:
+            return None
+
+        extra = [entry for entry in pieces if entry[0].piece_type != 'king']
+        if len(extra) != 1:
+            return None
+        piece, piece_row, piece_col = extra[0]
+        table = self.tables.get(PIECE_MATERIAL.get(piece.piece_type))
+        if table is None:
+            return None
+
+        strong = piece.color
+        kings = {entry[0].color: entry for entry in pieces if entry[0].piece_type == 'king'}
+        if len(kings) != 2:
+            return None
+        # Castling rights are not part of the tables
+        if piece.piece_type == 'rook' and not piece.has_moved and not kings[strong][0].has_moved:
+            return None
+
+        # Tables are stored with the strong side as white; mirror ranks otherwise
+        def square(row, col):
+            return (row if strong == 'white' else 7 - row) * 8 + col
+        _, wk_row, wk_col = kings[strong]
+        _, bk_row, bk_col = kings['black' if strong == 'white' else 'white']
+        index = (square(wk_row, wk_col) * 4096 + square(bk_row, bk_col) * 64 +
+                 square(piece_row, piece_col))
+        code, dtm = table.probe_index(board.current_turn == strong, index)
+        if code == ILLEGAL:
+            return None
+        return code, dtm
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+
+
+def bitbase_score(code, dtm):
+    """Search score for the side to move of a probed position"""
+    if code == WIN:
+        return BITBASE_WIN - dtm
+    if code == LOSS:
+        return -(BITBASE_WIN - dtm)
+    return 0
+
+
+_default_bitbases = None
+
+
+def default_bitbases():
+    """The process-wide bitbases in $CHESS_BITBASES, loaded on first use"""
+    global _default_bitbases
+    directory = os.environ.get(BITBASE_PATH_ENV)
+    if not directory:
+        return None
+    if _default_bitbases is None or _default_bitbases.directory != directory:
+        _default_bitbases = Bitbases(directory)
+    return _default_bitbases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and probe endgame bitbases")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    generate_parser = subparsers.add_parser('generate', help="build KQK, KRK and KPK")
+    generate_parser.add_argument('directory', help="output directory")
+    probe_parser = subparsers.add_parser('probe', help="look up FEN positions")
+    probe_parser.add_argument('directory', help="bitbase directory")
+    probe_parser.add_argument('fens', nargs='+', help="positions to probe")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        generate_all(args.directory, log=sys.stderr)
+        return
+
+    from .board import ChessBoard
+    bitbases = Bitbases(args.directory)
+    for fen in args.fens:
+        result = bitbases.probe(ChessBoard.from_fen(fen))
+        if result is None:
+            print(f"{fen}: not covered")
+        else:
+            code, dtm = result
+            outcome = {DRAW: 'draw', WIN: 'win', LOSS: 'loss'}[code]
+            print(f"{fen}: {outcome}" + (f" in {dtm} plies" if code != DRAW else ''))
+
+
+if __name__ == "__main__":
+    main()
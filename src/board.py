@@ -2,10 +2,13 @@ import pygame
 from .piece import Piece
 from .move_validator import MoveValidator
 from .ai import ChessAI
+from .zobrist import hash_board, is_repetition
+from .history import GameHistory, MoveRecord, capture_state
+from .events import MoveMade, CheckGiven, MateGiven, GameEnded, PositionReset, ConsoleSink
 from .constants import *
 
 class ChessBoard:
-    def __init__(self, create_ai=True, load_images=True):
+    def __init__(self, create_ai=True, load_images=True, verbose=True):
         self.board = [[None for _ in range(8)] for _ in range(8)]
         self.selected_piece = None
         self.selected_pos = None
@@ -19,7 +22,14 @@ class ChessBoard:
         self.game_over_time = None
         self.winner = None
         self.move_count = 0
+        self.halfmove_clock = 0
+        self.position_history = []
+        self.draw_reason = None
+        self.observers = [ConsoleSink()] if verbose else []
+        self._status = None
         self.validator = MoveValidator(self)
+        # Created with the position; scratch copies made for search never need one
+        self.history = None
         
         if load_images:
             self.initialize_board()
@@ -35,8 +45,162 @@ class ChessBoard:
         for col in range(8):
             self.board[0][col] = Piece('black', piece_order[col])
             self.board[7][col] = Piece('white', piece_order[col])
+        self.position_history = [hash_board(self)]
+        self.history = GameHistory(self)
 
-    def move_piece(self, from_pos, to_pos, checking_future=False):
+    @classmethod
+    def from_fen(cls, fen, create_ai=False, load_images=False, verbose=False):
+        """Create a board set up from a FEN (or 4-field EPD) string"""
+        new_board = cls(create_ai=create_ai, load_images=False, verbose=verbose)
+        new_board.load_fen(fen, load_images=load_images)
+        return new_board
+
+    def load_fen(self, fen, load_images=True):
+        """Replace the current position with the one described by a FEN string"""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN, expected at least 4 fields: {fen!r}")
+        placement, turn, castling, en_passant = fields[:4]
+
+        ranks = placement.split('/')
+        if len(ranks) != 8:
+            raise ValueError(f"Invalid FEN placement: {placement!r}")
+        board = [[None for _ in range(8)] for _ in range(8)]
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                elif char.lower() in FEN_PIECE_TYPES and col < 8:
+                    color = 'white' if char.isupper() else 'black'
+                    board[row][col] = Piece(color, FEN_PIECE_TYPES[char.lower()], load_image=load_images)
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN placement: {placement!r}")
+            if col != 8:
+                raise ValueError(f"Invalid FEN placement: {placement!r}")
+
+        if turn not in ('w', 'b'):
+            raise ValueError(f"Invalid FEN side to move: {turn!r}")
+
+        last_double_pawn = None
+        if en_passant != '-':
+            # The target is behind a pawn the side not to move has just pushed
+            # two squares, so it must be empty with that pawn in front of it
+            # and an empty square it came from behind it
+            target_rank = '6' if turn == 'w' else '3'
+            if len(en_passant) != 2 or en_passant[0] not in 'abcdefgh' or en_passant[1] != target_rank:
+                raise ValueError(f"Invalid FEN en passant square: {en_passant!r}")
+            col = 'abcdefgh'.index(en_passant[0])
+            row = '87654321'.index(en_passant[1])
+            step = 1 if turn == 'w' else -1
+            pawn = board[row + step][col]
+            if (board[row][col] or board[row - step][col] or not pawn or
+                    pawn.piece_type != 'pawn' or pawn.color != ('black' if turn == 'w' else 'white')):
+                raise ValueError(f"Invalid FEN en passant square: {en_passant!r}")
+            last_double_pawn = (row + step, col)
+
+        self.set_position(
+            board,
+            'white' if turn == 'w' else 'black',
+            castling,
+            last_double_pawn,
+            int(fields[4]) if len(fields) > 4 else 0,
+            int(fields[5]) - 1 if len(fields) > 5 else 0
+        )
+
+    def set_position(self, board, current_turn, castling='', last_double_pawn=None,
+                     halfmove_clock=0, move_count=0):
+        """Install a piece grid and its game state, resetting selection and game over"""
+        # Castling rights are tracked through has_moved flags on kings and rooks;
+        # every other piece is marked moved too so none can pass for a rook
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece and piece.piece_type != 'pawn':
+                    piece.has_moved = True
+        for char, row, rook_col in CASTLING_SQUARES:
+            if char not in castling:
+                continue
+            color = 'white' if char.isupper() else 'black'
+            king = board[row][4]
+            rook = board[row][rook_col]
+            if (king and king.piece_type == 'king' and king.color == color and
+                rook and rook.piece_type == 'rook' and rook.color == color):
+                king.has_moved = False
+                rook.has_moved = False
+
+        self.board = board
+        self.current_turn = current_turn
+        self.last_double_pawn = last_double_pawn
+        self.halfmove_clock = halfmove_clock
+        self.move_count = move_count
+
+        self.selected_piece = None
+        self.selected_pos = None
+        self.valid_moves = []
+        self.last_move = None
+        self.game_over = False
+        self.game_over_time = None
+        self.winner = None
+        self.draw_reason = None
+        self._status = None
+        self.position_history = [hash_board(self)]
+        self.in_check['white'] = self.validator.is_in_check('white')
+        self.in_check['black'] = self.validator.is_in_check('black')
+        self.history = GameHistory(self)
+        self._emit_reset()
+
+    def get_castling_rights(self):
+        """Return the remaining castling rights as a FEN-style string (e.g. 'KQk')"""
+        castling = ''
+        for char, row, rook_col in CASTLING_SQUARES:
+            color = 'white' if char.isupper() else 'black'
+            king = self.board[row][4]
+            rook = self.board[row][rook_col]
+            if (king and king.piece_type == 'king' and king.color == color and not king.has_moved and
+                rook and rook.piece_type == 'rook' and rook.color == color and not rook.has_moved):
+                castling += char
+        return castling
+
+    def to_fen(self):
+        """Serialize the current position as a FEN string"""
+        ranks = []
+        for row in range(8):
+            rank = ''
+            empty = 0
+            for col in range(8):
+                piece = self.board[row][col]
+                if not piece:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_PIECE_LETTERS[piece.piece_type]
+                rank += letter.upper() if piece.color == 'white' else letter
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+
+        castling = self.get_castling_rights()
+
+        en_passant = '-'
+        if self.last_double_pawn:
+            row, col = self.last_double_pawn
+            target_row = row + 1 if row == 4 else row - 1
+            en_passant = 'abcdefgh'[col] + '87654321'[target_row]
+
+        return ' '.join([
+            '/'.join(ranks),
+            'w' if self.current_turn == 'white' else 'b',
+            castling or '-',
+            en_passant,
+            str(self.halfmove_clock),
+            str(self.move_count + 1)
+        ])
+
+    def move_piece(self, from_pos, to_pos, checking_future=False, promotion='queen'):
         if not self.validator.is_valid_move(from_pos, to_pos, checking_future):
             return False
 
@@ -45,29 +209,29 @@ class ChessBoard:
         
         piece = self.board[from_row][from_col]
         target_piece = self.board[to_row][to_col]
-        is_capture = target_piece is not None
+        is_en_passant = piece is not None and self._is_en_passant_capture(piece, from_pos, to_pos)
+        is_capture = target_piece is not None or is_en_passant
         
-        # Get the move notation before making any changes
-        move_text = ''
-        if piece:
-            # Handle castling notation
+        # Disambiguation for SAN has to be worked out before the move is made
+        ambiguous_origins = ()
+        if not checking_future and piece and (self.history is not None or self._wants_notation()):
+            ambiguous_origins = self._find_ambiguous_origins(piece, from_pos, to_pos)
+
+        # Record what the move changes so it can be taken back
+        record = None
+        if not checking_future and piece and self.history is not None:
+            captured_pos = (from_row, to_col) if is_en_passant else to_pos
+            record = MoveRecord(from_pos, to_pos, piece, piece.has_moved,
+                                self.board[captured_pos[0]][captured_pos[1]], captured_pos)
             if piece.piece_type == 'king' and abs(from_col - to_col) == 2:
-                move_text = 'O-O' if to_col == 6 else 'O-O-O'
-            else:
-                # Regular move notation
-                if piece.piece_type != 'pawn':
-                    move_text += piece.piece_type[0].upper()
-                
-                # For pawn captures, add the file
-                if piece.piece_type == 'pawn' and from_col != to_col:
-                    move_text += 'abcdefgh'[from_col]
-                    
-                # Add capture symbol if applicable
-                if is_capture:
-                    move_text += 'x'
-                    
-                # Add destination square
-                move_text += 'abcdefgh'[to_col] + '87654321'[to_row]
+                rook_from = (to_row, 7 if to_col == 6 else 0)
+                rook = self.board[rook_from[0]][rook_from[1]]
+                if rook:
+                    record.rook = rook
+                    record.rook_from = rook_from
+                    record.rook_to = (to_row, 5 if to_col == 6 else 3)
+                    record.rook_had_moved = rook.has_moved
+            record.state_before = capture_state(self)
         
         # Handle castling
         if piece and piece.piece_type == 'king' and abs(from_col - to_col) == 2:
@@ -91,11 +255,28 @@ class ChessBoard:
         self.board[from_row][from_col] = None
         if piece:
             piece.has_moved = True
+        self._status = None
+
+        # Remove the pawn captured en passant
+        if is_en_passant:
+            self.board[from_row][to_col] = None
+
+        # Promote pawns reaching the last rank
+        if piece and self._should_promote_pawn(piece, to_row):
+            promoted = Piece(piece.color, promotion, load_image=piece.image is not None)
+            promoted.has_moved = True
+            self.board[to_row][to_col] = promoted
+            if record:
+                record.promoted = promoted
         
         # Update game state if not checking future moves
         if not checking_future:
             # Store last move for en passant
             self.last_move = (from_pos, to_pos)
+            if piece.piece_type == 'pawn' or is_capture:
+                self.halfmove_clock = 0
+            else:
+                self.halfmove_clock += 1
             if piece and piece.piece_type == 'pawn' and abs(to_row - from_row) == 2:
                 self.last_double_pawn = (to_row, to_col)
             else:
@@ -103,27 +284,140 @@ class ChessBoard:
                 
             # Switch turns
             self.current_turn = 'black' if piece.color == 'white' else 'white'
+            self.position_history.append(hash_board(self))
             
-            # Check for check/checkmate
+            # Check for check/checkmate/stalemate and draws by rule
             opponent_color = 'black' if piece.color == 'white' else 'white'
-            if self.validator.is_in_check(opponent_color):
-                if self.validator.is_checkmate(opponent_color):
-                    move_text += '#'
-                    self.game_over = True
-                    self.winner = piece.color.capitalize()
-                    print(f"\nCheckmate! {self.winner} wins!")
-                else:
-                    move_text += '+'
-
-            # Print the move
-            if piece.color == 'white':
-                print(f"{(self.move_count // 2) + 1}.{move_text}", end=' ')
+            status = self.get_status()
+            self.in_check[piece.color] = False
+            self.in_check[opponent_color] = status.in_check
+            if status.checkmate:
+                self.game_over = True
+                self.winner = piece.color.capitalize()
             else:
-                print(f"{move_text}")
+                if status.stalemate:
+                    self.draw_reason = 'stalemate'
+                elif self.halfmove_clock >= 100:
+                    self.draw_reason = 'fifty-move rule'
+                elif self.is_repetition(3):
+                    self.draw_reason = 'repetition'
+                self.game_over = self.draw_reason is not None
+
+            move_number = self.move_count + 1
+            if piece.color == 'black':
                 self.move_count += 1
+
+            event = None
+            if record or self.observers:
+                promoted_to = promotion if self._should_promote_pawn(piece, to_row) else None
+                event = MoveMade(move_number, piece.color, piece.piece_type, from_pos, to_pos,
+                                 is_capture, promoted_to, status.in_check, status.checkmate,
+                                 ambiguous_origins)
+
+            if record:
+                record.state_after = capture_state(self)
+                record.hash = self.position_history[-1]
+                record.event = event
+                self.history.push(self, record)
+
+            if self.observers:
+                self._emit(event)
+                if status.checkmate:
+                    self._emit(MateGiven(move_number, self.winner))
+                    self._emit(GameEnded('1-0' if piece.color == 'white' else '0-1',
+                                         'checkmate', self.winner))
+                elif status.in_check:
+                    self._emit(CheckGiven(move_number, piece.color))
+                if self.draw_reason:
+                    self._emit(GameEnded('1/2-1/2', self.draw_reason))
                 
         return True
 
+    def undo_move(self):
+        """Take back the last move made or redone, keeping it available to redo"""
+        if self.history is None or not self.history.undo(self):
+            return False
+        self._emit_reset()
+        return True
+
+    def redo_move(self):
+        if self.history is None or not self.history.redo(self):
+            return False
+        self._emit_reset()
+        return True
+
+    def goto_ply(self, ply):
+        """Show the position after ply half-moves of the recorded game"""
+        if self.history is not None and ply != self.history.ply:
+            self.history.goto(self, ply)
+            self._emit_reset()
+
+    def takeback(self):
+        """Undo back to the last position with white to move (the human's turn)"""
+        if self.history is None or not self.history.undo(self):
+            return False
+        while self.current_turn != 'white' and self.history.undo(self):
+            pass
+        self._emit_reset()
+        return True
+
+    def invalidate(self):
+        """Drop cached status and selection after the grid was changed directly"""
+        self._status = None
+        self.selected_piece = None
+        self.selected_pos = None
+        self.valid_moves = []
+
+    def is_repetition(self, count=3):
+        """Whether the current position has occurred count times this game"""
+        return is_repetition(self.position_history, self.halfmove_clock, count)
+
+    def add_observer(self, sink):
+        """Register a sink whose handle(event) receives move and game events.
+
+        A board with a game history first sends the new sink a PositionReset
+        with the start position and the moves played so far.
+        """
+        self.observers.append(sink)
+        if self.history is not None:
+            sink.handle(self._reset_event())
+
+    def remove_observer(self, sink):
+        self.observers.remove(sink)
+
+    def _emit(self, event):
+        for sink in self.observers:
+            sink.handle(event)
+
+    def _emit_reset(self):
+        """Tell sinks the game now stands at another ply, so they drop or regain moves"""
+        if self.observers:
+            self._emit(self._reset_event())
+
+    def _reset_event(self):
+        history = self.history
+        return PositionReset(history.start_fen,
+                             [record.event for record in history.records[:history.ply]],
+                             self.to_fen())
+
+    def _wants_notation(self):
+        return any(sink.wants_notation for sink in self.observers)
+
+    def _find_ambiguous_origins(self, piece, from_pos, to_pos):
+        """Other pieces of the same type and color that could also reach to_pos"""
+        if piece.piece_type in ('pawn', 'king'):
+            return ()
+        if self._status is not None and self._status.color == piece.color:
+            candidates = [origin for origin, targets in self._status.legal_moves.items()
+                          if to_pos in targets]
+        else:
+            candidates = [(row, col) for row in range(8) for col in range(8)
+                          if self.board[row][col] and self.board[row][col].color == piece.color and
+                          to_pos in self.validator.get_valid_moves((row, col))]
+        return tuple(origin for origin in candidates
+                     if origin != from_pos and
+                     self.board[origin[0]][origin[1]].piece_type == piece.piece_type)
+
     def _handle_castling(self, from_row, from_col, to_row, to_col):
         # Kingside castling
         if to_col == 6:
@@ -151,17 +445,15 @@ class ChessBoard:
         self.current_turn = 'black' if self.current_turn == 'white' else 'white'
 
         # Update check status
-        self.in_check['white'] = self.validator.is_in_check('white')
-        self.in_check['black'] = self.validator.is_in_check('black')
+        status = self.get_status()
+        self.in_check[self.current_turn] = status.in_check
 
         # Check for checkmate
-        if self.validator.is_checkmate(self.current_turn):
+        if status.checkmate:
             self.winner = 'White' if self.current_turn == 'black' else 'Black'
-            print(f"\n{'='*50}")
-            print(f"CHECKMATE! {self.winner} wins!")
-            print(f"{'='*50}\n")
             self.game_over = True
             self.game_over_time = pygame.time.get_ticks()
+            self._emit(GameEnded('1-0' if self.winner == 'White' else '0-1', 'checkmate', self.winner))
 
     def make_ai_move(self):
         if self.ai and not self.game_over:
@@ -181,19 +473,33 @@ class ChessBoard:
                 self.valid_moves = []
 
     def get_valid_moves(self, row, col, checking_future=False):
+        piece = self.board[row][col]
+        if not checking_future and piece and piece.color == self.current_turn:
+            return list(self.get_status().legal_moves.get((row, col), []))
         return self.validator.get_valid_moves((row, col), checking_future)
 
+    def get_status(self):
+        """Legal moves and check/mate/stalemate for the side to move.
+
+        Computed once per position and dropped whenever a piece moves.
+        """
+        if self._status is None:
+            self._status = self.validator.compute_status(self.current_turn)
+        return self._status
+
     def get_piece(self, pos):
         row, col = pos
         return self.board[row][col]
 
     def copy(self):
         """Create a copy of the board for move validation"""
-        new_board = ChessBoard(create_ai=False, load_images=False)
+        new_board = ChessBoard(create_ai=False, load_images=False, verbose=False)
         new_board.board = self.validator._create_board_copy()
         new_board.current_turn = self.current_turn
         new_board.last_move = self.last_move
         new_board.last_double_pawn = self.last_double_pawn
+        new_board.move_count = self.move_count
+        new_board.halfmove_clock = self.halfmove_clock
         return new_board
 
     def find_king(self, color):
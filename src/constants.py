@@ -18,6 +18,8 @@ BANNER_HEIGHT = 100
 BANNER_DISPLAY_TIME = 3000
 AI_MOVE_DELAY = 500
 AI_DEPTH = 3
+# Clamp for the infinite scores minimax returns when a side has no moves
+MAX_SCORE = 32000
 
 # Piece values for AI evaluation
 PIECE_VALUES = {
@@ -83,4 +85,52 @@ QUEEN_TABLE = [
     [-10,  5,  5,  5,  5,  5,  0,-10],
     [-10,  0,  5,  0,  0,  0,  0,-10],
     [-20,-10,-10, -5, -5,-10,-10,-20]
-]
\ No newline at end of file
+]
+
+PIECE_SQUARE_TABLES = {
+    'pawn': PAWN_TABLE,
+    'knight': KNIGHT_TABLE,
+    'bishop': BISHOP_TABLE,
+    'rook': ROOK_TABLE,
+    'queen': QUEEN_TABLE
+}
+
+# Pawn structure terms in centipawns, per pawn. 'passed' is indexed by how
+# many ranks the pawn has advanced from its side's back rank; 'shield' is per
+# pawn in front of a king on its back rank (half for pawns two ranks ahead)
+PAWN_STRUCTURE_WEIGHTS = {
+    'doubled': -15,
+    'isolated': -12,
+    'backward': -8,
+    'passed': [0, 5, 10, 20, 35, 60, 100, 0],
+    'shield': 10
+}
+
+# FEN notation
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+FEN_PIECE_TYPES = {
+    'p': 'pawn',
+    'n': 'knight',
+    'b': 'bishop',
+    'r': 'rook',
+    'q': 'queen',
+    'k': 'king'
+}
+
+FEN_PIECE_LETTERS = {piece_type: letter for letter, piece_type in FEN_PIECE_TYPES.items()}
+
+# (FEN letter, back row, rook column) for each castling right
+CASTLING_SQUARES = (('K', 7, 7), ('Q', 7, 0), ('k', 0, 7), ('q', 0, 0))
+
+# Packed position encoding: 4-bit piece codes, with BLACK_PIECE_FLAG set for black
+PIECE_CODES = {
+    'pawn': 1,
+    'knight': 2,
+    'bishop': 3,
+    'rook': 4,
+    'queen': 5,
+    'king': 6
+}
+BLACK_PIECE_FLAG = 8
+PACKED_POSITION_SIZE = 32
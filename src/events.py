@@ -0,0 +1,251 @@
+import json
+import sys
+from .constants import *
+
+
+class MoveMade:
+    """A move applied to the board. Its SAN text is only built when asked for."""
+    type = 'move'
+
+    def __init__(self, move_number, color, piece_type, from_pos, to_pos, capture=False,
+                 promotion=None, check=False, mate=False, ambiguous_origins=()):
+        self.move_number = move_number
+        self.color = color
+        self.piece_type = piece_type
+        self.from_pos = from_pos
+        self.to_pos = to_pos
+        self.capture = capture
+        self.promotion = promotion
+        self.check = check
+        self.mate = mate
+        # Squares of same-type pieces that could also have moved to to_pos
+        self.ambiguous_origins = ambiguous_origins
+        self._san = None
+
+    @property
+    def san(self):
+        if self._san is None:
+            self._san = self._build_san()
+        return self._san
+
+    def _build_san(self):
+        from_row, from_col = self.from_pos
+        to_row, to_col = self.to_pos
+        if self.piece_type == 'king' and abs(from_col - to_col) == 2:
+            text = 'O-O' if to_col == 6 else 'O-O-O'
+        else:
+            text = ''
+            if self.piece_type == 'pawn':
+                if self.capture:
+                    text += 'abcdefgh'[from_col]
+            else:
+                text += FEN_PIECE_LETTERS[self.piece_type].upper()
+                if self.ambiguous_origins:
+                    if all(col != from_col for _, col in self.ambiguous_origins):
+                        text += 'abcdefgh'[from_col]
+                    elif all(row != from_row for row, _ in self.ambiguous_origins):
+                        text += '87654321'[from_row]
+                    else:
+                        text += 'abcdefgh'[from_col] + '87654321'[from_row]
+            if self.capture:
+                text += 'x'
+            text += 'abcdefgh'[to_col] + '87654321'[to_row]
+            if self.promotion:
+                text += '=' + FEN_PIECE_LETTERS[self.promotion].upper()
+        if self.mate:
+            text += '#'
+        elif self.check:
+            text += '+'
+        return text
+
+    @property
+    def uci(self):
+        (from_row, from_col), (to_row, to_col) = self.from_pos, self.to_pos
+        text = 'abcdefgh'[from_col] + '87654321'[from_row] + 'abcdefgh'[to_col] + '87654321'[to_row]
+        if self.promotion:
+            text += FEN_PIECE_LETTERS[self.promotion]
+        return text
+
+    def as_dict(self, include_notation=False):
+        result = {'type': self.type, 'move_number': self.move_number, 'color': self.color,
+                  'move': self.uci, 'capture': self.capture}
+        if include_notation:
+            result['san'] = self.san
+        return result
+
+
+class CheckGiven:
+    type = 'check'
+
+    def __init__(self, move_number, color):
+        self.move_number = move_number
+        # The side giving check
+        self.color = color
+
+    def as_dict(self, include_notation=False):
+        return {'type': self.type, 'move_number': self.move_number, 'color': self.color}
+
+
+class MateGiven:
+    type = 'mate'
+
+    def __init__(self, move_number, winner):
+        self.move_number = move_number
+        self.winner = winner
+
+    def as_dict(self, include_notation=False):
+        return {'type': self.type, 'move_number': self.move_number, 'winner': self.winner}
+
+
+class GameEnded:
+    type = 'game_end'
+
+    def __init__(self, result, reason, winner=None):
+        self.result = result
+        self.reason = reason
+        self.winner = winner
+
+    def as_dict(self, include_notation=False):
+        return {'type': self.type, 'result': self.result, 'reason': self.reason,
+                'winner': self.winner}
+
+
+class PositionReset:
+    """The board moved to another point of its game (undo, redo, seeking) or was set up anew.
+
+    moves holds the MoveMade events leading from start_fen to the current
+    position, so sinks that keep a game's moves can rebuild their list.
+    """
+    type = 'reset'
+
+    def __init__(self, start_fen, moves, fen):
+        self.start_fen = start_fen
+        self.moves = tuple(moves)
+        self.fen = fen
+
+    def as_dict(self, include_notation=False):
+        result = {'type': self.type, 'ply': len(self.moves), 'fen': self.fen,
+                  'moves': [move.uci for move in self.moves]}
+        if include_notation:
+            result['san'] = [move.san for move in self.moves]
+        return result
+
+
+class NullSink:
+    """Discards every event"""
+    wants_notation = False
+
+    def handle(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleSink:
+    """Prints moves and results to stdout as the game is played"""
+    wants_notation = True
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        # Plies shown since the last reset, to tell when the game was rewound
+        self.ply = None
+
+    def handle(self, event):
+        if isinstance(event, MoveMade):
+            self.ply = (self.ply or 0) + 1
+            if event.color == 'white':
+                print(f"{event.move_number}.{event.san}", end=' ', file=self.stream)
+            else:
+                print(event.san, file=self.stream)
+        elif isinstance(event, PositionReset):
+            # The first reset only says where the game stands when we join it
+            if self.ply is not None and len(event.moves) != self.ply:
+                last = event.moves[-1] if event.moves else None
+                where = (f"after {last.move_number}.{'' if last.color == 'white' else '..'}{last.san}"
+                         if last else "to the start")
+                print(f"\n(back {where})", file=self.stream)
+            self.ply = len(event.moves)
+        elif isinstance(event, GameEnded):
+            if event.winner:
+                print(f"\nCheckmate! {event.winner} wins!", file=self.stream)
+            else:
+                print(f"\n{event.reason.capitalize()}!", file=self.stream)
+
+    def close(self):
+        pass
+
+
+class PgnWriter:
+    """Collects a game's moves in memory and writes it as PGN when the game ends.
+
+    Games that do not start from the initial position get SetUp and FEN
+    headers; the start position comes from the board when the writer is
+    added as an observer.
+    """
+    wants_notation = True
+
+    def __init__(self, output, headers=None, line_length=80, start_fen=START_FEN):
+        self.output = output
+        self.headers = dict(headers or {})
+        self.line_length = line_length
+        self.start_fen = start_fen
+        self.moves = []
+
+    def handle(self, event):
+        if isinstance(event, MoveMade):
+            self.moves.append(event)
+        elif isinstance(event, PositionReset):
+            # Taken-back moves must not reach the written game
+            self.moves = list(event.moves)
+            self.start_fen = event.start_fen
+        elif isinstance(event, GameEnded):
+            self.write_game(event.result)
+
+    def write_game(self, result='*'):
+        headers = {'Event': '?', 'Site': '?', 'Date': '????.??.??', 'Round': '?',
+                   'White': '?', 'Black': '?', **self.headers, 'Result': result}
+        if self.start_fen != START_FEN:
+            headers['SetUp'] = '1'
+            headers['FEN'] = self.start_fen
+        lines = [f'[{name} "{value}"]' for name, value in headers.items()]
+        lines.append('')
+
+        tokens = []
+        for index, move in enumerate(self.moves):
+            if move.color == 'white':
+                tokens.append(f"{move.move_number}.")
+            elif index == 0:
+                tokens.append(f"{move.move_number}...")
+            tokens.append(move.san)
+        tokens.append(result)
+
+        line = ''
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > self.line_length:
+                lines.append(line)
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        lines.append(line)
+
+        self.output.write('\n'.join(lines) + '\n\n')
+        self.moves = []
+
+    def close(self):
+        if self.moves:
+            self.write_game()
+        self.output.flush()
+
+
+class JsonLinesWriter:
+    """Writes one JSON object per event to a buffered file"""
+    def __init__(self, output, include_notation=False):
+        self.output = output
+        self.wants_notation = include_notation
+
+    def handle(self, event):
+        self.output.write(json.dumps(event.as_dict(self.wants_notation)) + '\n')
+
+    def close(self):
+        self.output.flush()
@@ -0,0 +1,159 @@
+# Plies between full snapshots used to seek through long games
+SNAPSHOT_INTERVAL = 32
+
+
+class MoveRecord:
+    """The reversible delta of one applied move.
+
+    Pieces are stored as the objects themselves, so undo and redo put back
+    exactly what was on the board (images included) without re-creating it.
+    """
+    __slots__ = ('from_pos', 'to_pos', 'piece', 'piece_had_moved', 'captured', 'captured_pos',
+                 'rook', 'rook_from', 'rook_to', 'rook_had_moved', 'promoted',
+                 'state_before', 'state_after', 'hash', 'event')
+
+    def __init__(self, from_pos, to_pos, piece, piece_had_moved, captured=None, captured_pos=None,
+                 rook=None, rook_from=None, rook_to=None, rook_had_moved=False, promoted=None):
+        self.from_pos = from_pos
+        self.to_pos = to_pos
+        self.piece = piece
+        self.piece_had_moved = piece_had_moved
+        self.captured = captured
+        self.captured_pos = captured_pos
+        self.rook = rook
+        self.rook_from = rook_from
+        self.rook_to = rook_to
+        self.rook_had_moved = rook_had_moved
+        self.promoted = promoted
+        self.state_before = None
+        self.state_after = None
+        self.hash = None
+        # The MoveMade event of the move, replayed to sinks after undo and redo
+        self.event = None
+
+
+def capture_state(board):
+    """Snapshot the scalar game state a move changes"""
+    return (board.current_turn, board.last_double_pawn, board.halfmove_clock, board.move_count,
+            board.last_move, board.game_over, board.winner, board.draw_reason,
+            board.in_check['white'], board.in_check['black'])
+
+
+def restore_state(board, state):
+    (board.current_turn, board.last_double_pawn, board.halfmove_clock, board.move_count,
+     board.last_move, board.game_over, board.winner, board.draw_reason,
+     board.in_check['white'], board.in_check['black']) = state
+
+
+class GameHistory:
+    """Move records for one game with a cursor for undo, redo and seeking.
+
+    records[:ply] have been applied to the board; records[ply:] can be redone
+    until a new move is made. Every SNAPSHOT_INTERVAL plies a full snapshot
+    is kept so goto() never replays more than SNAPSHOT_INTERVAL moves.
+    """
+    def __init__(self, board):
+        self.records = []
+        self.ply = 0
+        self.start_hash = board.position_history[-1] if board.position_history else None
+        self.start_fen = board.to_fen()
+        self.snapshots = {0: self._snapshot(board)}
+
+    def __len__(self):
+        return len(self.records)
+
+    def can_undo(self):
+        return self.ply > 0
+
+    def can_redo(self):
+        return self.ply < len(self.records)
+
+    def push(self, board, record):
+        """Append the record of a move just made on board, discarding any redo tail"""
+        if self.ply < len(self.records):
+            del self.records[self.ply:]
+            for ply in [ply for ply in self.snapshots if ply > self.ply]:
+                del self.snapshots[ply]
+        self.records.append(record)
+        self.ply += 1
+        if self.ply % SNAPSHOT_INTERVAL == 0:
+            self.snapshots[self.ply] = self._snapshot(board)
+
+    def undo(self, board):
+        if not self.can_undo():
+            return False
+        self.ply -= 1
+        record = self.records[self.ply]
+        grid = board.board
+        to_row, to_col = record.to_pos
+        from_row, from_col = record.from_pos
+
+        grid[from_row][from_col] = record.piece
+        record.piece.has_moved = record.piece_had_moved
+        grid[to_row][to_col] = None
+        if record.captured:
+            grid[record.captured_pos[0]][record.captured_pos[1]] = record.captured
+        if record.rook:
+            grid[record.rook_to[0]][record.rook_to[1]] = None
+            grid[record.rook_from[0]][record.rook_from[1]] = record.rook
+            record.rook.has_moved = record.rook_had_moved
+
+        restore_state(board, record.state_before)
+        board.position_history.pop()
+        board.invalidate()
+        return True
+
+    def redo(self, board):
+        if not self.can_redo():
+            return False
+        record = self.records[self.ply]
+        self.ply += 1
+        grid = board.board
+        to_row, to_col = record.to_pos
+        from_row, from_col = record.from_pos
+
+        if record.captured:
+            grid[record.captured_pos[0]][record.captured_pos[1]] = None
+        if record.rook:
+            grid[record.rook_from[0]][record.rook_from[1]] = None
+            grid[record.rook_to[0]][record.rook_to[1]] = record.rook
+            record.rook.has_moved = True
+        grid[from_row][from_col] = None
+        grid[to_row][to_col] = record.promoted or record.piece
+        record.piece.has_moved = True
+
+        restore_state(board, record.state_after)
+        board.position_history.append(record.hash)
+        board.invalidate()
+        return True
+
+    def goto(self, board, ply):
+        """Move the board to the position after ply half-moves"""
+        ply = max(0, min(ply, len(self.records)))
+        if abs(ply - self.ply) > SNAPSHOT_INTERVAL:
+            base = max(snapshot_ply for snapshot_ply in self.snapshots if snapshot_ply <= ply)
+            if abs(ply - base) < abs(ply - self.ply):
+                self._restore(board, base)
+        while self.ply > ply:
+            self.undo(board)
+        while self.ply < ply:
+            self.redo(board)
+
+    def _snapshot(self, board):
+        squares = tuple((piece, piece.has_moved) if piece else None
+                        for row in board.board for piece in row)
+        return squares, capture_state(board)
+
+    def _restore(self, board, ply):
+        squares, state = self.snapshots[ply]
+        for index, entry in enumerate(squares):
+            if entry:
+                piece, has_moved = entry
+                piece.has_moved = has_moved
+                board.board[index // 8][index % 8] = piece
+            else:
+                board.board[index // 8][index % 8] = None
+        restore_state(board, state)
+        board.position_history = [self.start_hash] + [record.hash for record in self.records[:ply]]
+        self.ply = ply
+        board.invalidate()
@@ -0,0 +1,128 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+
+class LoadStats:
+    """Latencies of move requests and the outcome counts of a load run"""
+    def __init__(self):
+        self.latencies = []
+        self.games = 0
+        self.moves = 0
+        self.busy = 0
+        self.errors = 0
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class GameClient:
+    """A JSON-lines connection to the game server, one request in flight at a time"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = 0
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, unix_path=None):
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        self._ids += 1
+        self.writer.write(json.dumps({'id': self._ids, 'op': op, **fields}).encode() + b'\n')
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_games(client, stats, games, max_plies, rng, time_limit=None):
+    """Play random moves against the engine, timing each move round trip"""
+    for _ in range(games):
+        reply = await client.request('new', color='white')
+        if not reply['ok']:
+            stats.errors += 1
+            continue
+        game_id = reply['game']
+        plies = 0
+        while reply['status'] == 'ongoing' and reply['legal'] and plies < max_plies:
+            move = rng.choice(reply['legal'])
+            start = time.perf_counter()
+            next_reply = await client.request('move', game=game_id, move=move, time=time_limit)
+            if not next_reply['ok']:
+                if next_reply.get('busy'):
+                    stats.busy += 1
+                    await asyncio.sleep(0.05)
+                    continue
+                stats.errors += 1
+                break
+            stats.latencies.append(time.perf_counter() - start)
+            stats.moves += 2 if 'engine' in next_reply else 1
+            plies += 2
+            reply = next_reply
+        await client.request('close', game=game_id)
+        stats.games += 1
+
+
+async def run(host='127.0.0.1', port=8765, unix_path=None, clients=8, games=1, max_plies=40,
+              time_limit=None, seed=0):
+    """Run `clients` concurrent connections each playing `games` games.
+
+    Returns the LoadStats, the wall time and the server's own stats.
+    """
+    stats = LoadStats()
+    connections = [await GameClient.connect(host, port, unix_path) for _ in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(play_games(client, stats, games, max_plies, random.Random(seed + index),
+                                      time_limit)
+                           for index, client in enumerate(connections)))
+    elapsed = time.perf_counter() - start
+    server_stats = await connections[0].request('stats')
+    for client in connections:
+        await client.close()
+    return stats, elapsed, server_stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate load against the chess game server")
+    parser.add_argument('--host', default='127.0.0.1', help="server host")
+    parser.add_argument('-p', '--port', type=int, default=8765, help="server port")
+    parser.add_argument('--unix', help="connect to this Unix socket path instead of TCP")
+    parser.add_argument('-c', '--clients', type=int, default=8, help="concurrent connections")
+    parser.add_argument('-g', '--games', type=int, default=1, help="games played per connection")
+    parser.add_argument('--max-plies', type=int, default=40, help="plies before a game is abandoned")
+    parser.add_argument('-t', '--time', type=float, default=None,
+                        help="engine time per move to request (capped by the server)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the client moves")
+    args = parser.parse_args(argv)
+
+    stats, elapsed, server_stats = asyncio.run(run(
+        args.host, args.port, args.unix, args.clients, args.games, args.max_plies, args.time,
+        args.seed))
+
+    print(f"{stats.games} games, {stats.moves} moves in {elapsed:.1f}s "
+          f"({stats.moves / elapsed:.1f} moves/sec)")
+    print(f"move latency p50={1000 * stats.percentile(0.5):.1f}ms "
+          f"p99={1000 * stats.percentile(0.99):.1f}ms "
+          f"busy={stats.busy} errors={stats.errors}")
+    if server_stats.get('ok'):
+        print(f"engine queue {json.dumps(server_stats['engine'])}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
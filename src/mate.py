@@ -0,0 +1,223 @@
+import argparse
+from collections import namedtuple
+from .board import ChessBoard
+from .ai import ChessAI
+from .analysis import move_to_uci, read_epd
+from .search_stats import SearchStats
+from .zobrist import hash_board
+from .constants import *
+
+MateResult = namedtuple('MateResult', 'mate_in line nodes elapsed')
+
+# Positions with a forced mate in exactly dm moves (proved by full-width search)
+MATE_SUITE = (
+    ('6k1/5ppp/8/8/8/8/5PPP/1R4K1 w - - 0 1', 1),
+    ('r2qkb1r/pp2nppp/3p4/2pNN1B1/2BnP3/3P4/PPP2PPP/R2bK2R w KQkq - 1 1', 2),
+    ('7k/8/4K3/8/8/8/8/R7 w - - 0 1', 2),
+    ('r1b1kb1r/pppp1ppp/5q2/4n3/3KP3/2N3PN/PPP4P/R1BQ1B1R b kq - 0 1', 3),
+    ('4k3/8/8/4K3/8/8/8/7R w - - 0 1', 3),
+    ('7k/8/8/8/5K2/8/8/6R1 w - - 0 1', 4),
+    ('7k/8/8/8/4K3/8/8/6R1 w - - 0 1', 4),
+    ('7k/8/8/8/8/8/4K3/6Q1 w - - 0 1', 5),
+)
+
+_MISSING = object()
+
+
+class MateSolver(ChessAI):
+    """Depth-first proof search for forced mates.
+
+    Attacker nodes try checking moves first and, with one move left, only
+    look at checks (a quiet move cannot mate). Defender nodes must have every
+    reply answered. Proofs and disproofs are kept in the solver's own
+    transposition table, keyed by position, with the number of attacker
+    moves they hold for.
+    """
+    def __init__(self, color, checks_only=False):
+        super().__init__(color)
+        self.cache = None
+        # Only consider checking moves for the attacker (faster, but misses
+        # mates that need a quiet move)
+        self.checks_only = checks_only
+
+    def solve(self, board, max_moves):
+        """Return a MateResult for the side to move, mate_in None if there is no mate"""
+        self.stats = SearchStats()
+        self.tt = {}
+        mate_in, line = None, []
+        self.stats.start()
+        try:
+            for moves in range(1, max_moves + 1):
+                found = self._attack(board, moves)
+                if found is not None:
+                    mate_in, line = moves, found
+                    break
+        finally:
+            self.stats.stop()
+            self.last_stats = self.stats
+        return MateResult(mate_in, line, self.stats.nodes, self.stats.elapsed)
+
+    def _probe(self, key, moves):
+        entry = self.tt.get(key)
+        self.stats.tt_probes += 1
+        if entry:
+            line, proved_moves, _ = entry
+            if line is not None and proved_moves <= moves:
+                self.stats.tt_hits += 1
+                return line
+            if line is None and proved_moves >= moves:
+                self.stats.tt_hits += 1
+                return None
+        return _MISSING
+
+    def _store(self, key, moves, line, refutation=None):
+        self.tt[key] = (line, moves, refutation)
+        return line
+
+    def _attack(self, board, moves):
+        """Mating line for the attacker (to move) within `moves` moves, or None"""
+        key = hash_board(board)
+        found = self._probe(key, moves)
+        if found is not _MISSING:
+            return found
+        self.stats.expanded_nodes += 1
+
+        checks = []
+        quiet = []
+        for move in board.get_status().moves():
+            if self._gives_check(board, move):
+                child = self.simulate_move(board, move)
+                self.stats.nodes += 1
+                if child.validator.is_checkmate(self.opponent_color):
+                    return self._store(key, moves, [move])
+                checks.append((move, child))
+            elif moves > 1 and not self.checks_only:
+                quiet.append((move, None))
+        self.stats.moves_generated += len(checks) + len(quiet)
+
+        if moves > 1:
+            for move, child in checks + quiet:
+                if child is None:
+                    child = self.simulate_move(board, move)
+                    self.stats.nodes += 1
+                line = self._defend(child, moves - 1)
+                if line is not None:
+                    return self._store(key, moves, [move] + line)
+        return self._store(key, moves, None)
+
+    def _gives_check(self, board, move):
+        """Whether a move checks the defender, tried in place on the grid.
+
+        Castling, en passant and promotions change more than two squares, so
+        those are played out on a copy instead.
+        """
+        (from_row, from_col), (to_row, to_col) = move
+        grid = board.board
+        piece = grid[from_row][from_col]
+        captured = grid[to_row][to_col]
+        if ((piece.piece_type == 'king' and abs(to_col - from_col) == 2) or
+                (piece.piece_type == 'pawn' and (to_row in (0, 7) or
+                                                 (from_col != to_col and captured is None)))):
+            return self.simulate_move(board, move).validator.is_in_check(self.opponent_color)
+
+        grid[to_row][to_col] = piece
+        grid[from_row][from_col] = None
+        try:
+            return board.validator.is_in_check(self.opponent_color)
+        finally:
+            grid[from_row][from_col] = piece
+            grid[to_row][to_col] = captured
+
+    def _defend(self, board, moves):
+        """Line where the defender (to move) holds out longest against mate within
+        `moves` attacker moves, or None if some reply escapes"""
+        key = hash_board(board)
+        found = self._probe(key, moves)
+        if found is not _MISSING:
+            return found
+        self.stats.expanded_nodes += 1
+
+        replies = board.get_status().moves()
+        if not replies:
+            # Checkmate was caught by the attacker, so this is stalemate
+            return self._store(key, moves, None)
+        self.stats.moves_generated += len(replies)
+        # The reply that escaped a shorter mate is the likeliest to escape again
+        entry = self.tt.get(key)
+        if entry and entry[2] in replies:
+            replies.remove(entry[2])
+            replies.insert(0, entry[2])
+
+        longest = None
+        for move in replies:
+            child = self.simulate_move(board, move)
+            self.stats.nodes += 1
+            line = self._attack(child, moves)
+            if line is None:
+                return self._store(key, moves, None, move)
+            if longest is None or len(line) + 1 > len(longest):
+                longest = [move] + line
+        return self._store(key, moves, longest)
+
+
+def find_mate(board, max_moves, checks_only=False):
+    """Search for a forced mate by the side to move in at most max_moves moves.
+
+    Returns a MateResult; mate_in is the shortest mate found (None when there
+    is none within max_moves) and line alternates attacker and defender moves.
+    With checks_only=False a None result proves there is no such mate.
+    """
+    return MateSolver(board.current_turn, checks_only).solve(board, max_moves)
+
+
+def run_suite(entries, max_moves=5, checks_only=False):
+    """Solve (fen, expected mate_in) entries, yielding a result dict per position"""
+    for fen, expected in entries:
+        board = ChessBoard.from_fen(fen)
+        result = find_mate(board, max_moves, checks_only)
+        yield {
+            'fen': fen,
+            'expected': expected,
+            'mate_in': result.mate_in,
+            'ok': result.mate_in == expected,
+            'line': [move_to_uci(move) for move in result.line],
+            'nodes': result.nodes,
+            'time': round(result.elapsed, 3),
+            'nps': round(result.nodes / result.elapsed) if result.elapsed else 0
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve mate problems and report solver speed")
+    parser.add_argument('epd', nargs='?',
+                        help="EPD file with dm operations (default: the built-in suite)")
+    parser.add_argument('-m', '--max-moves', type=int, default=5, help="longest mate to look for")
+    parser.add_argument('--checks-only', action='store_true',
+                        help="only try checking moves for the attacker")
+    args = parser.parse_args(argv)
+
+    if args.epd:
+        entries = [(fen, int(operations['dm']) if 'dm' in operations else None)
+                   for fen, operations in read_epd(args.epd)]
+    else:
+        entries = MATE_SUITE
+
+    solved = 0
+    total_nodes = 0
+    total_time = 0.0
+    count = 0
+    for result in run_suite(entries, args.max_moves, args.checks_only):
+        count += 1
+        solved += result['ok']
+        total_nodes += result['nodes']
+        total_time += result['time']
+        status = 'ok' if result['ok'] else 'FAIL'
+        print(f"{status:4} dm{result['expected']} found {result['mate_in']} "
+              f"{' '.join(result['line'])}  {result['nodes']} nodes {result['time']:.2f}s  "
+              f"{result['fen']}")
+    print(f"Solved {solved}/{count} in {total_time:.1f}s "
+          f"({total_nodes / total_time if total_time else 0:.0f} nodes/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,24 @@
+from .search_stats import timed
+
+
+class PositionStatus:
+    """Legal moves and check, checkmate and stalemate flags for the side to move"""
+    def __init__(self, color, legal_moves, in_check):
+        self.color = color
+        # {from_pos: [to_pos, ...]} for every piece with at least one legal move
+        self.legal_moves = legal_moves
+        self.in_check = in_check
+        has_moves = bool(legal_moves)
+        self.checkmate = in_check and not has_moves
+        self.stalemate = not in_check and not has_moves
+
+    def moves(self):
+        """Return every legal move as a (from_pos, to_pos) pair"""
+        return [(from_pos, to_pos)
+                for from_pos, targets in self.legal_moves.items()
+                for to_pos in targets]
+
+
 class MoveValidator:
     def __init__(self, board):
         self.board = board
@@ -79,19 +100,23 @@ class MoveValidator:
         # Only check castling if not skipping king checks
         if not skip_king_check and not piece.has_moved and not self.is_in_check(piece.color):
             # Kingside castling
-            rook = self.board.get_piece((row, 7))
-            if (rook and not rook.has_moved and
+            if (self._castling_rook((row, 7), piece.color) and
                 not any(self.board.get_piece((row, col)) for col in range(5, 7))):
                 moves.append((row, 6))
             
             # Queenside castling
-            rook = self.board.get_piece((row, 0))
-            if (rook and not rook.has_moved and
+            if (self._castling_rook((row, 0), piece.color) and
                 not any(self.board.get_piece((row, col)) for col in range(1, 4))):
                 moves.append((row, 2))
         
         return moves
     
+    def _castling_rook(self, pos, color):
+        """Whether an unmoved rook of color stands on pos"""
+        rook = self.board.get_piece(pos)
+        return (rook is not None and rook.piece_type == 'rook' and rook.color == color and
+                not rook.has_moved)
+
     def _get_pawn_moves(self, pos):
         """Get all possible pawn moves including captures and en passant"""
         row, col = pos
@@ -255,24 +280,35 @@ class MoveValidator:
         valid_moves = []
         raw_moves = self._get_raw_moves(pos)
 
-        # For each potential move, create a copy of the board and try the move
+        # Try each move in place on the live grid and undo it afterwards,
+        # rather than copying the whole board per candidate
+        grid = self.board.board
+        from_row, from_col = pos
         for move in raw_moves:
-            # Create a temporary board to test the move
-            temp_board = self.board.copy()
-            
-            # Make the move on the temporary board
-            from_row, from_col = pos
             to_row, to_col = move
-            
-            temp_board.board[to_row][to_col] = temp_board.board[from_row][from_col]
-            temp_board.board[from_row][from_col] = None
-            
+            captured = grid[to_row][to_col]
+            # An en passant capture also lifts the pawn beside it, which can
+            # open a rank onto our king
+            en_passant = piece.piece_type == 'pawn' and from_col != to_col and captured is None
+            if en_passant:
+                passed_pawn = grid[from_row][to_col]
+                grid[from_row][to_col] = None
+            grid[to_row][to_col] = piece
+            grid[from_row][from_col] = None
+
             # If this move doesn't leave our king in check, it's valid
-            if not self.would_move_cause_check(piece.color, temp_board):
+            leaves_check = self.would_move_cause_check(piece.color, self.board)
+
+            grid[from_row][from_col] = piece
+            grid[to_row][to_col] = captured
+            if en_passant:
+                grid[from_row][to_col] = passed_pawn
+            if not leaves_check:
                 valid_moves.append(move)
 
         return valid_moves
 
+    @timed('legality')
     def would_move_cause_check(self, color, board):
         """Check if the given board state would result in the given color being in check"""
         # Find king position
@@ -295,8 +331,8 @@ class MoveValidator:
             for col in range(8):
                 piece = board.board[row][col]
                 if piece and piece.color == opponent_color:
-                    # Get raw moves to avoid recursion
-                    raw_moves = self._get_raw_moves((row, col), skip_king_check=True)
+                    # Get raw moves on the hypothetical board to avoid recursion
+                    raw_moves = board.validator._get_raw_moves((row, col), skip_king_check=True)
                     if king_pos in raw_moves:
                         return True
         return False
@@ -330,6 +366,22 @@ class MoveValidator:
         
         return is_pinned
 
+    def compute_status(self, color):
+        """Generate all legal moves for color along with its check status"""
+        legal_moves = {}
+        for row in range(8):
+            for col in range(8):
+                piece = self.board.get_piece((row, col))
+                if piece and piece.color == color:
+                    moves = self.get_valid_moves((row, col))
+                    # Castling moves still need the squares the king crosses checked
+                    if piece.piece_type == 'king':
+                        moves = [move for move in moves
+                                 if abs(move[1] - col) != 2 or self.is_valid_move((row, col), move)]
+                    if moves:
+                        legal_moves[(row, col)] = moves
+        return PositionStatus(color, legal_moves, self.is_in_check(color))
+
     def is_checkmate(self, color):
         """Check if the given color is in checkmate"""
         # If not in check, can't be checkmate
@@ -362,6 +414,7 @@ class MoveValidator:
                         return False
         return True
     
+    @timed('legality')
     def is_valid_move(self, from_pos, to_pos, checking_future=False):
         """Check if a move is valid without causing infinite recursion"""
         piece = self.board.get_piece(from_pos)
@@ -381,8 +434,7 @@ class MoveValidator:
                 
             # Check kingside castling
             if to_col == 6:
-                rook = self.board.get_piece((from_row, 7))
-                if not rook or rook.has_moved:
+                if not self._castling_rook((from_row, 7), piece.color):
                     return False
                 # Check if squares between king and rook are empty and not attacked
                 for col in range(5, 7):
@@ -393,8 +445,7 @@ class MoveValidator:
                 
             # Check queenside castling
             elif to_col == 2:
-                rook = self.board.get_piece((from_row, 0))
-                if not rook or rook.has_moved:
+                if not self._castling_rook((from_row, 0), piece.color):
                     return False
                 # Check if squares between king and rook are empty and not attacked
                 for col in range(1, 4):
@@ -415,9 +466,9 @@ class MoveValidator:
             return True
 
         # Otherwise, make the move on a copy of the board and check if it leaves us in check
-        temp_board = self._create_board_copy()
-        self._make_simple_move(temp_board, from_pos, to_pos)
-        return not self.is_in_check(piece.color, {"board": temp_board})
+        temp_board = self.board.copy()
+        self._make_simple_move(temp_board.board, from_pos, to_pos)
+        return not self.would_move_cause_check(piece.color, temp_board)
     
     def _create_board_copy(self):
         """Create a simple copy of the board state without recursive validation"""
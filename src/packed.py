@@ -0,0 +1,200 @@
+import struct
+import numpy as np
+from .board import ChessBoard
+from .piece import Piece
+from .constants import *
+
+# Fixed-width position record (32 bytes):
+#   occupancy  uint64, bit row * 8 + col set for every occupied square
+#   pieces     16 bytes, one 4-bit piece code per occupied square in square
+#              order, low nibble first
+#   flags      bit 0 black to move, bits 1-4 castling rights K, Q, k, q
+#   ep         file of the pawn that just double-moved, 255 if none
+#   halfmove   halfmove clock (saturates at 255)
+#   fullmove   fullmove number
+PACKED_POSITION = struct.Struct('<Q16sBBBH3x')
+
+POSITION_DTYPE = np.dtype([
+    ('occupancy', '<u8'),
+    ('pieces', 'u1', (16,)),
+    ('flags', 'u1'),
+    ('ep', 'u1'),
+    ('halfmove', 'u1'),
+    ('fullmove', '<u2'),
+    ('reserved', 'u1', (3,))
+])
+
+# Store file: 32-byte header followed by a flat array of position records
+STORE_HEADER = struct.Struct('<8sIIQ8x')
+STORE_MAGIC = b'CHESSPOS'
+STORE_VERSION = 1
+
+NO_EN_PASSANT = 255
+PIECE_TYPES_BY_CODE = {code: piece_type for piece_type, code in PIECE_CODES.items()}
+
+
+def pack_position(board):
+    """Encode a ChessBoard position as a 32-byte record"""
+    occupancy = 0
+    codes = []
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece:
+                occupancy |= 1 << (row * 8 + col)
+                code = PIECE_CODES[piece.piece_type]
+                if piece.color == 'black':
+                    code |= BLACK_PIECE_FLAG
+                codes.append(code)
+    if len(codes) > 32:
+        raise ValueError(f"Cannot pack a position with {len(codes)} pieces")
+    codes += [0] * (32 - len(codes))
+    nibbles = bytes(codes[i] | codes[i + 1] << 4 for i in range(0, 32, 2))
+
+    flags = 1 if board.current_turn == 'black' else 0
+    castling = board.get_castling_rights()
+    for i, (char, _, _) in enumerate(CASTLING_SQUARES):
+        if char in castling:
+            flags |= 2 << i
+    ep = board.last_double_pawn[1] if board.last_double_pawn else NO_EN_PASSANT
+
+    return PACKED_POSITION.pack(occupancy, nibbles, flags, ep,
+                                min(board.halfmove_clock, 255),
+                                min(board.move_count + 1, 0xFFFF))
+
+
+def unpack_position(data, load_images=False):
+    """Decode a 32-byte record (bytes or a POSITION_DTYPE record) into a ChessBoard"""
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = data.tobytes()
+    occupancy, nibbles, flags, ep, halfmove, fullmove = PACKED_POSITION.unpack(data)
+
+    grid = [[None for _ in range(8)] for _ in range(8)]
+    index = 0
+    for square in range(64):
+        if not occupancy >> square & 1:
+            continue
+        code = nibbles[index // 2] >> (4 * (index % 2)) & 0x0F
+        index += 1
+        color = 'black' if code & BLACK_PIECE_FLAG else 'white'
+        grid[square // 8][square % 8] = Piece(color, PIECE_TYPES_BY_CODE[code & 7],
+                                              load_image=load_images)
+
+    current_turn = 'black' if flags & 1 else 'white'
+    castling = ''.join(char for i, (char, _, _) in enumerate(CASTLING_SQUARES)
+                       if flags & (2 << i))
+    last_double_pawn = None
+    if ep != NO_EN_PASSANT:
+        # The side to move is the one that can capture en passant
+        last_double_pawn = (3 if current_turn == 'white' else 4, ep)
+
+    board = ChessBoard(create_ai=False, load_images=False, verbose=False)
+    board.set_position(grid, current_turn, castling, last_double_pawn,
+                       halfmove, max(fullmove - 1, 0))
+    return board
+
+
+def unpack_squares(records):
+    """Expand POSITION_DTYPE records into an (N, 64) int8 array of piece codes.
+
+    Square index is row * 8 + col; empty squares are 0. Fully vectorized, so
+    it is suitable for large batch reads straight from a memory-mapped store.
+    """
+    records = np.atleast_1d(records)
+    occupancy = np.ascontiguousarray(records['occupancy'], dtype='<u8')
+    occupied = np.unpackbits(occupancy.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+
+    pieces = records['pieces']
+    codes = np.empty((len(records), 32), dtype=np.int8)
+    codes[:, 0::2] = pieces & 0x0F
+    codes[:, 1::2] = pieces >> 4
+
+    index = np.cumsum(occupied, axis=1, dtype=np.int16) - 1
+    np.clip(index, 0, 31, out=index)
+    return np.where(occupied, np.take_along_axis(codes, index, axis=1), 0).astype(np.int8)
+
+
+class PositionWriter:
+    """Append packed positions to a store file, fixing up the header on close"""
+    def __init__(self, path, append=False):
+        self.path = path
+        if append:
+            self.file = open(path, 'r+b')
+            self.count = _read_header(self.file)
+            self.file.seek(STORE_HEADER.size + self.count * PACKED_POSITION_SIZE)
+            self.file.truncate()
+        else:
+            self.file = open(path, 'wb')
+            self.count = 0
+            self.file.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, PACKED_POSITION_SIZE, 0))
+
+    def write_board(self, board):
+        self.write_packed(pack_position(board))
+
+    def write_packed(self, data):
+        """Write one or more already-packed records (bytes or a POSITION_DTYPE array)"""
+        if isinstance(data, np.ndarray):
+            self.count += data.size
+            data = data.tobytes()
+        else:
+            self.count += len(data) // PACKED_POSITION_SIZE
+        self.file.write(data)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.seek(0)
+        self.file.write(STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, PACKED_POSITION_SIZE, self.count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_header(f):
+    f.seek(0)
+    magic, version, record_size, count = STORE_HEADER.unpack(f.read(STORE_HEADER.size))
+    if magic != STORE_MAGIC or version != STORE_VERSION or record_size != PACKED_POSITION_SIZE:
+        raise ValueError(f"Not a position store: {getattr(f, 'name', f)!r}")
+    return count
+
+
+class PositionStore:
+    """Random-access, memory-mapped view over a position store file.
+
+    records is a read-only numpy.memmap of POSITION_DTYPE, so slicing it reads
+    batches without copying.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            count = _read_header(f)
+        if count:
+            self.records = np.memmap(path, dtype=POSITION_DTYPE, mode='r',
+                                     offset=STORE_HEADER.size, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=POSITION_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def get_board(self, index, load_images=False):
+        return unpack_position(self.records[index], load_images)
+
+    def squares(self, start=0, stop=None):
+        """Return positions [start, stop) as an (N, 64) array of piece codes"""
+        return unpack_squares(self.records[start:stop])
+
+
+def write_store(path, boards):
+    """Pack an iterable of ChessBoards into a new store file and return the count"""
+    with PositionWriter(path) as writer:
+        for board in boards:
+            writer.write_board(board)
+    return writer.count
@@ -0,0 +1,178 @@
+import argparse
+import random
+import time
+from .constants import *
+
+# Entries in a PawnHashTable; a power of two so keys index by masking
+PAWN_TABLE_SIZE = 1 << 14
+
+
+class PawnHashTable:
+    """Fixed-size cache of pawn-structure evaluations indexed by pawn-only Zobrist key.
+
+    Each slot keeps the last structure stored there; pawn structures change
+    far less often than piece placement, so most leaves hit.
+    """
+    def __init__(self, size=PAWN_TABLE_SIZE):
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.entries = [None] * size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.entries[index]
+        return None
+
+    def store(self, key, entry):
+        index = key & self.mask
+        self.keys[index] = key
+        self.entries[index] = entry
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+def evaluate_pawns(grid, weights=PAWN_STRUCTURE_WEIGHTS):
+    """Score the pawn structure of a board grid.
+
+    Returns (score, white pawn squares, black pawn squares) with the score
+    from white's point of view; the square sets are kept for pawn_shield.
+    """
+    white = []
+    black = []
+    for row in range(8):
+        for col in range(8):
+            piece = grid[row][col]
+            if piece and piece.piece_type == 'pawn':
+                if piece.color == 'white':
+                    white.append((7 - row, col))
+                else:
+                    black.append((row, col))
+
+    # Both sides are scored with ranks counted from their own back rank;
+    # the enemy's pawns are mirrored into the same frame
+    score = (_side_score(white, [(7 - rank, col) for rank, col in black], weights) -
+             _side_score(black, [(7 - rank, col) for rank, col in white], weights))
+    white_squares = frozenset((7 - rank, col) for rank, col in white)
+    black_squares = frozenset(black)
+    return score, white_squares, black_squares
+
+
+def _side_score(own, enemy, weights):
+    files = [[] for _ in range(8)]
+    for rank, col in own:
+        files[col].append(rank)
+    enemy_files = [[] for _ in range(8)]
+    for rank, col in enemy:
+        enemy_files[col].append(rank)
+
+    score = 0
+    for col in range(8):
+        if len(files[col]) > 1:
+            score += weights['doubled'] * (len(files[col]) - 1)
+
+    for rank, col in own:
+        neighbours = [r for c in (col - 1, col + 1) if 0 <= c < 8 for r in files[c]]
+        if not neighbours:
+            score += weights['isolated']
+        elif (all(r > rank for r in neighbours) and
+              any(rank + 2 in enemy_files[c] for c in (col - 1, col + 1) if 0 <= c < 8)):
+            # No pawn can ever defend it and its stop square is held by an enemy pawn
+            score += weights['backward']
+
+        if not any(r > rank for c in (col - 1, col, col + 1) if 0 <= c < 8
+                   for r in enemy_files[c]):
+            score += weights['passed'][rank]
+    return score
+
+
+def pawn_shield(king_pos, color, pawn_squares, weights=PAWN_STRUCTURE_WEIGHTS):
+    """Bonus for own pawns directly in front of a king still on its back rank"""
+    if king_pos is None:
+        return 0
+    row, col = king_pos
+    if color == 'white':
+        if row != 7:
+            return 0
+        near, far = 6, 5
+    else:
+        if row != 0:
+            return 0
+        near, far = 1, 2
+
+    score = 0
+    for c in (col - 1, col, col + 1):
+        if (near, c) in pawn_squares:
+            score += weights['shield']
+        elif (far, c) in pawn_squares:
+            score += weights['shield'] // 2
+    return score
+
+
+def compare_eval_cost(fens, depth=AI_DEPTH):
+    """Search each position with the pawn terms off, uncached and cached.
+
+    Returns one dict per configuration with leaf count, microseconds per
+    leaf evaluation and (when cached) the pawn table hit rate.
+    """
+    from .board import ChessBoard
+    from .ai import ChessAI
+
+    results = []
+    for name, pawn_structure, cached in (('material+pst', False, False),
+                                         ('pawns uncached', True, False),
+                                         ('pawns cached', True, True)):
+        leaves = 0
+        eval_time = 0.0
+        table = PawnHashTable() if cached else None
+        for fen in fens:
+            board = ChessBoard.from_fen(fen)
+            ai = ChessAI(board.current_turn)
+            ai.cache = None
+            # Bitbase hits would skip the evaluation being timed
+            ai.bitbases = None
+            ai.pawn_structure = pawn_structure
+            ai.pawn_table = table
+            evaluate = ai.evaluate_position
+
+            def timed_evaluate(board):
+                nonlocal leaves, eval_time
+                start = time.perf_counter()
+                score = evaluate(board)
+                eval_time += time.perf_counter() - start
+                leaves += 1
+                return score
+            ai.evaluate_position = timed_evaluate
+            # Same root move order in every configuration
+            random.seed(0)
+            ai.search(board, depth)
+
+        result = {'config': name, 'leaves': leaves,
+                  'us_per_leaf': round(1e6 * eval_time / leaves, 2) if leaves else 0.0}
+        if table:
+            result['pawn_hit_rate'] = round(table.hit_rate, 3)
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cost of the pawn-structure terms")
+    parser.add_argument('fens', nargs='*', default=[START_FEN], help="positions to search")
+    parser.add_argument('-d', '--depth', type=int, default=AI_DEPTH, help="search depth")
+    args = parser.parse_args(argv)
+
+    for result in compare_eval_cost(args.fens, args.depth):
+        line = f"{result['config']:15} {result['leaves']:8} leaves {result['us_per_leaf']:8.2f} us/leaf"
+        if 'pawn_hit_rate' in result:
+            line += f"  pawn table hit rate {result['pawn_hit_rate']:.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import argparse
+import gzip
+import os
+import re
+import time
+from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor
+from .board import ChessBoard
+from .constants import *
+
+# Events yielded while replaying a PGN stream
+GameStart = namedtuple('GameStart', 'game headers offset')
+MoveEvent = namedtuple('MoveEvent', 'game ply san move board')
+GameEnd = namedtuple('GameEnd', 'game result plies error')
+
+TAG_PAIR = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+MOVETEXT_TOKEN = re.compile(r'\s*(\{|\(|\)|;|\$\d+|1-0|0-1|1/2-1/2|\*|\d+\.+|[^\s{}();$]+)')
+SAN_MOVE = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+SAN_PIECE_TYPES = {'N': 'knight', 'B': 'bishop', 'R': 'rook', 'Q': 'queen', 'K': 'king'}
+
+
+def open_pgn(path):
+    """Open a PGN file in binary mode, transparently decompressing .gz files"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def tokenize(lines):
+    """Yield (kind, value, offset) tokens from (offset, text) line pairs.
+
+    kind is 'tag' (value is a (name, value) pair), 'move' or 'result'.
+    Comments, NAGs, move numbers and variations are skipped; only one line is
+    held in memory at a time.
+    """
+    in_comment = False
+    variation_depth = 0
+
+    for offset, line in lines:
+        if in_comment:
+            end = line.find('}')
+            if end == -1:
+                continue
+            line = line[end + 1:]
+            in_comment = False
+
+        stripped = line.strip()
+        if not stripped or stripped.startswith('%'):
+            continue
+
+        if variation_depth == 0 and stripped.startswith('['):
+            match = TAG_PAIR.match(stripped)
+            if match:
+                yield 'tag', (match.group(1), match.group(2).replace('\\"', '"')), offset
+            continue
+
+        pos = 0
+        while True:
+            match = MOVETEXT_TOKEN.match(line, pos)
+            if not match:
+                break
+            token = match.group(1)
+            pos = match.end()
+
+            if token == '{':
+                end = line.find('}', pos)
+                if end == -1:
+                    in_comment = True
+                    break
+                pos = end + 1
+            elif token == ';':
+                break
+            elif token == '(':
+                variation_depth += 1
+            elif token == ')':
+                variation_depth = max(0, variation_depth - 1)
+            elif variation_depth > 0 or token[0] == '$' or token[0].isdigit() and token.endswith('.'):
+                continue
+            elif token in RESULTS:
+                yield 'result', token, offset
+            else:
+                yield 'move', token.rstrip('!?'), offset
+
+
+def resolve_san(board, san):
+    """Find the legal move matching a SAN string.
+
+    Returns (from_pos, to_pos, promotion) or None when no legal move matches.
+    """
+    san = san.rstrip('+#')
+    color = board.current_turn
+    back_row = 7 if color == 'white' else 0
+
+    if san in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        from_pos = (back_row, 4)
+        to_pos = (back_row, 6 if len(san) == 3 else 2)
+        king = board.get_piece(from_pos)
+        if (king and king.piece_type == 'king' and king.color == color and
+            to_pos in board.get_valid_moves(*from_pos)):
+            return from_pos, to_pos, None
+        return None
+
+    match = SAN_MOVE.match(san)
+    if not match:
+        return None
+    piece_letter, from_file, from_rank, destination, promotion_letter = match.groups()
+    piece_type = SAN_PIECE_TYPES[piece_letter] if piece_letter else 'pawn'
+    to_pos = ('87654321'.index(destination[1]), 'abcdefgh'.index(destination[0]))
+    from_col = 'abcdefgh'.index(from_file) if from_file else None
+    from_row = '87654321'.index(from_rank) if from_rank else None
+    promotion = SAN_PIECE_TYPES[promotion_letter] if promotion_letter else None
+
+    candidates = []
+    for row in range(8):
+        if from_row is not None and row != from_row:
+            continue
+        for col in range(8):
+            if from_col is not None and col != from_col:
+                continue
+            piece = board.board[row][col]
+            if (piece and piece.color == color and piece.piece_type == piece_type and
+                to_pos in board.get_valid_moves(row, col)):
+                candidates.append((row, col))
+
+    if len(candidates) != 1:
+        return None
+    if piece_type == 'pawn' and to_pos[0] in (0, 7) and promotion is None:
+        promotion = 'queen'
+    return candidates[0], to_pos, promotion
+
+
+def _read_lines(f, offset=0):
+    """Yield (offset, text) for each line of a binary file object"""
+    for raw in f:
+        yield offset, raw.decode('utf-8', errors='replace')
+        offset += len(raw)
+
+
+def replay_games(f, start=0, end=None):
+    """Replay the games in a binary PGN file object, yielding events.
+
+    Yields a GameStart, one MoveEvent per ply (carrying the live board, which
+    is mutated by the next move) and a GameEnd for every game. Only games whose
+    first tag lies in [start, end) are replayed.
+    """
+    game = -1
+    headers = {}
+    header_offset = None
+    board = None
+    ply = 0
+    error = None
+    in_headers = False
+
+    def finish(result):
+        return GameEnd(game, result or headers.get('Result', '*'), ply, error)
+
+    for kind, value, offset in tokenize(_read_lines(f, start)):
+        if kind == 'tag':
+            if not in_headers:
+                if board is not None:
+                    yield finish(None)
+                    board = None
+                if end is not None and offset >= end:
+                    return
+                game += 1
+                headers = {}
+                header_offset = offset
+                ply = 0
+                error = None
+                in_headers = True
+            headers[value[0]] = value[1]
+            continue
+
+        if board is None:
+            if header_offset is None:
+                game += 1
+                header_offset = offset
+            in_headers = False
+            try:
+                board = ChessBoard.from_fen(headers.get('FEN', START_FEN))
+            except ValueError as e:
+                board = ChessBoard.from_fen(START_FEN)
+                error = str(e)
+            yield GameStart(game, headers, header_offset)
+
+        if kind == 'result':
+            yield finish(value)
+            board = None
+            header_offset = None
+            headers = {}
+            continue
+
+        if error:
+            continue
+        move = resolve_san(board, value)
+        if move is None or not board.move_piece(move[0], move[1], promotion=move[2] or 'queen'):
+            error = f"Illegal move {value} at ply {ply + 1}"
+            continue
+        ply += 1
+        yield MoveEvent(game, ply, value, (move[0], move[1]), board)
+
+    if board is not None:
+        yield finish(None)
+
+
+def _seek_game_start(f, start):
+    """Position f at the first [Event tag at or after byte offset start"""
+    if start == 0:
+        f.seek(0)
+        return 0
+    # Reading from start - 1 consumes the rest of the line holding start
+    f.seek(start - 1)
+    offset = start - 1 + len(f.readline())
+    while True:
+        line = f.readline()
+        if not line:
+            return None
+        if line.startswith(b'[Event '):
+            f.seek(offset)
+            return offset
+        offset += len(line)
+
+
+class ReplayStats:
+    def __init__(self):
+        self.games = 0
+        self.plies = 0
+        self.errors = 0
+        self.results = Counter()
+        self.elapsed = 0.0
+
+    def record(self, event):
+        if isinstance(event, MoveEvent):
+            self.plies += 1
+        elif isinstance(event, GameEnd):
+            self.games += 1
+            self.results[event.result] += 1
+            if event.error:
+                self.errors += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.plies += other.plies
+        self.errors += other.errors
+        self.results.update(other.results)
+
+    @property
+    def games_per_second(self):
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        results = ', '.join(f"{result}: {count}" for result, count in sorted(self.results.items()))
+        return (f"{self.games} games, {self.plies} plies, {self.errors} errors "
+                f"in {self.elapsed:.1f}s ({self.games_per_second:.1f} games/sec) [{results}]")
+
+
+def replay_shard(path, start=0, end=None, visitor=None):
+    """Replay the games starting in a byte range of a PGN file.
+
+    visitor, if given, is called with every event. Returns a ReplayStats.
+    """
+    stats = ReplayStats()
+    begin = time.time()
+    with open_pgn(path) as f:
+        offset = _seek_game_start(f, start)
+        if offset is not None and (end is None or offset < end):
+            for event in replay_games(f, offset, end):
+                stats.record(event)
+                if visitor:
+                    visitor(event)
+    stats.elapsed = time.time() - begin
+    return stats
+
+
+def replay_file(path, workers=1, visitor=None):
+    """Replay every game in a PGN file, sharding by byte offset across processes.
+
+    Compressed files cannot be seeked cheaply and are always read by a single
+    process. visitor must be picklable when workers > 1.
+    """
+    begin = time.time()
+    if workers <= 1 or path.endswith('.gz'):
+        stats = replay_shard(path, visitor=visitor)
+    else:
+        size = os.path.getsize(path)
+        bounds = [size * i // workers for i in range(workers + 1)]
+        stats = ReplayStats()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(replay_shard, path, bounds[i], bounds[i + 1], visitor)
+                       for i in range(workers)]
+            for future in futures:
+                stats.merge(future.result())
+    stats.elapsed = time.time() - begin
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay PGN games through the rules engine")
+    parser.add_argument('pgn', help="input PGN file (.pgn or .pgn.gz)")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="worker processes")
+    args = parser.parse_args(argv)
+
+    print(replay_file(args.pgn, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import mmap
+import os
+import struct
+import time
+from .constants import *
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
+
+# Cache file: 32-byte header followed by buckets of ENTRIES_PER_BUCKET entries.
+# Each entry is two uint64s, check and data, with check = key ^ data. A reader
+# that catches an entry half-written sees a check that does not match its key
+# and treats it as a miss, so readers never need the lock.
+#
+# data layout:
+#   bits  0-15  score + 32768 (scores are clamped to +-MAX_SCORE)
+#   bits 16-23  search depth
+#   bits 24-39  best move, from square * 64 + to square + 1 (0 if none)
+#   bits 40-63  stamp, minutes since the epoch at last store or hit
+CACHE_HEADER = struct.Struct('<8sIII12x')
+CACHE_MAGIC = b'CHESSTT\x00'
+CACHE_VERSION = 1
+CACHE_ENTRY = struct.Struct('<QQ')
+ENTRIES_PER_BUCKET = 4
+BUCKET_SIZE = CACHE_ENTRY.size * ENTRIES_PER_BUCKET
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+# Shallower results are cheap to recompute and would only evict deeper ones
+CACHE_MIN_DEPTH = 3
+
+# Set to a file path to give every ChessAI a persistent cache by default
+CACHE_PATH_ENV = 'CHESS_SEARCH_CACHE'
+
+STAMP_MASK = (1 << 24) - 1
+
+
+def _stamp():
+    return int(time.time() // 60) & STAMP_MASK
+
+
+def _age(stamp, now):
+    # Stamps wrap after 2**24 minutes; compare them modulo that
+    return (now - stamp) & STAMP_MASK
+
+
+def encode_move(move):
+    if move is None:
+        return 0
+    (from_row, from_col), (to_row, to_col) = move
+    return (from_row * 8 + from_col) * 64 + to_row * 8 + to_col + 1
+
+
+def decode_move(code):
+    if not code:
+        return None
+    code -= 1
+    from_square, to_square = divmod(code, 64)
+    return divmod(from_square, 8), divmod(to_square, 8)
+
+
+class SearchCache:
+    """Persistent table of root search results keyed by Zobrist hash.
+
+    The file is memory-mapped and sized once, when created, from max_bytes.
+    Stores replace, in order of preference, the same position, an empty
+    entry, or the bucket's least recently used entry (shallowest first on
+    ties). Any number of processes can read concurrently; writers take an
+    exclusive lock on the file while choosing and writing an entry.
+    """
+    def __init__(self, path, max_bytes=DEFAULT_CACHE_SIZE, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            self._create(path, max_bytes)
+
+        self.file = open(path, 'rb' if readonly else 'r+b')
+        magic, version, entry_size, self.bucket_count = CACHE_HEADER.unpack(
+            self.file.read(CACHE_HEADER.size))
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or entry_size != CACHE_ENTRY.size:
+            self.file.close()
+            raise ValueError(f"Not a search cache file: {path}")
+        self.map = mmap.mmap(self.file.fileno(), 0,
+                             access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+
+    @staticmethod
+    def _create(path, max_bytes):
+        bucket_count = max(1, (max_bytes - CACHE_HEADER.size) // BUCKET_SIZE)
+        with open(path, 'wb') as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, CACHE_ENTRY.size, bucket_count))
+            f.truncate(CACHE_HEADER.size + bucket_count * BUCKET_SIZE)
+
+    def _bucket_offset(self, key):
+        return CACHE_HEADER.size + (key % self.bucket_count) * BUCKET_SIZE
+
+    def probe(self, key):
+        """Return (depth, score, move) stored for key, or None"""
+        self.probes += 1
+        offset = self._bucket_offset(key)
+        for index in range(ENTRIES_PER_BUCKET):
+            entry_offset = offset + index * CACHE_ENTRY.size
+            check, data = CACHE_ENTRY.unpack_from(self.map, entry_offset)
+            if data and check ^ data == key:
+                self.hits += 1
+                now = _stamp()
+                if not self.readonly and data >> 40 != now:
+                    self._touch(key, entry_offset, data, now)
+                return (data >> 16) & 0xFF, (data & 0xFFFF) - 32768, decode_move((data >> 24) & 0xFFFF)
+        return None
+
+    def _touch(self, key, entry_offset, data, now):
+        with self._locked():
+            check, current = CACHE_ENTRY.unpack_from(self.map, entry_offset)
+            if current == data and check ^ current == key:
+                data = (data & ((1 << 40) - 1)) | now << 40
+                CACHE_ENTRY.pack_into(self.map, entry_offset, key ^ data, data)
+
+    def store(self, key, depth, score, move):
+        """Record a search result, keeping any deeper result already stored for key"""
+        if self.readonly:
+            return
+        score = int(max(-MAX_SCORE, min(MAX_SCORE, score)))
+        now = _stamp()
+        data = (score + 32768) | min(depth, 255) << 16 | encode_move(move) << 24 | now << 40
+        offset = self._bucket_offset(key)
+
+        with self._locked():
+            victim = None
+            victim_rank = None
+            for index in range(ENTRIES_PER_BUCKET):
+                entry_offset = offset + index * CACHE_ENTRY.size
+                check, current = CACHE_ENTRY.unpack_from(self.map, entry_offset)
+                if current and check ^ current == key:
+                    if (current >> 16) & 0xFF > depth:
+                        return
+                    victim = entry_offset
+                    break
+                if not current:
+                    rank = (-1, 0)
+                else:
+                    rank = (-_age(current >> 40, now), (current >> 16) & 0xFF)
+                if victim_rank is None or rank < victim_rank:
+                    victim, victim_rank = entry_offset, rank
+            CACHE_ENTRY.pack_into(self.map, victim, key ^ data, data)
+        self.stores += 1
+
+    def _locked(self):
+        return _FileLock(self.file)
+
+    def used(self):
+        """Number of occupied entries (scans the whole file)"""
+        count = 0
+        for offset in range(CACHE_HEADER.size, len(self.map), CACHE_ENTRY.size):
+            if CACHE_ENTRY.unpack_from(self.map, offset)[1]:
+                count += 1
+        return count
+
+    @property
+    def capacity(self):
+        return self.bucket_count * ENTRIES_PER_BUCKET
+
+    def flush(self):
+        if not self.readonly:
+            self.map.flush()
+
+    def close(self):
+        if self.map is not None:
+            self.flush()
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _FileLock:
+    """Exclusive advisory lock on an open file for the duration of a with block"""
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info):
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """The process-wide cache named by $CHESS_SEARCH_CACHE, opened on first use"""
+    global _default_cache
+    path = os.environ.get(CACHE_PATH_ENV)
+    if not path:
+        return None
+    if _default_cache is None or _default_cache.path != path:
+        _default_cache = SearchCache(path)
+    return _default_cache
@@ -0,0 +1,212 @@
+import atexit
+import cProfile
+import functools
+import os
+import pstats
+import signal
+import sys
+import time
+from collections import Counter
+
+# Per-stage timers are only compiled in when this is set before import;
+# otherwise @timed returns the function untouched and costs nothing.
+PROFILE_COUNTERS = os.environ.get('CHESS_PROFILE_COUNTERS', '') not in ('', '0')
+
+TIMED_STAGES = ('movegen', 'legality', 'make', 'eval')
+
+_active_stats = None
+
+
+def timed(stage):
+    """Charge the exclusive time spent in the decorated function to a stage"""
+    def decorator(func):
+        if not PROFILE_COUNTERS:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = _active_stats
+            if stats is None:
+                return func(*args, **kwargs)
+            stats._enter(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats._exit()
+        return wrapper
+    return decorator
+
+
+class SearchStats:
+    """Counters collected during one ChessAI search"""
+    def __init__(self):
+        self.nodes = 0
+        self.qnodes = 0
+        self.depth = 0
+        self.elapsed = 0.0
+        self.expanded_nodes = 0
+        self.moves_generated = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.draw_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.pawn_probes = 0
+        self.bitbase_hits = 0
+        self.pawn_hits = 0
+        # Whether the result came straight from the persistent search cache
+        self.cache_hit = False
+        self.times = {stage: 0.0 for stage in TIMED_STAGES}
+        self._stack = []
+        self._mark = 0.0
+        self._start = None
+
+    def start(self):
+        global _active_stats
+        _active_stats = self
+        self._start = time.perf_counter()
+
+    def stop(self):
+        global _active_stats
+        _active_stats = None
+        self.elapsed = time.perf_counter() - self._start
+
+    def _enter(self, stage):
+        now = time.perf_counter()
+        if self._stack:
+            self.times[self._stack[-1]] += now - self._mark
+        self._stack.append(stage)
+        self._mark = now
+
+    def _exit(self):
+        now = time.perf_counter()
+        self.times[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    @property
+    def nodes_per_second(self):
+        return (self.nodes + self.qnodes) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def branching_factor(self):
+        return self.moves_generated / self.expanded_nodes if self.expanded_nodes else 0.0
+
+    @property
+    def cutoff_rate(self):
+        return self.beta_cutoffs / self.expanded_nodes if self.expanded_nodes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def pawn_hit_rate(self):
+        return self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+
+    def as_dict(self):
+        result = {
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'depth': self.depth,
+            'elapsed': round(self.elapsed, 4),
+            'nps': round(self.nodes_per_second),
+            'branching_factor': round(self.branching_factor, 2),
+            'cutoff_rate': round(self.cutoff_rate, 3),
+            'first_move_cutoff_rate': round(self.first_move_cutoff_rate, 3),
+            'draw_cutoffs': self.draw_cutoffs,
+            'tt_hit_rate': round(self.tt_hit_rate, 3),
+            'pawn_hit_rate': round(self.pawn_hit_rate, 3),
+            'bitbase_hits': self.bitbase_hits,
+            'cache_hit': self.cache_hit
+        }
+        if PROFILE_COUNTERS:
+            result['times'] = {stage: round(seconds, 4) for stage, seconds in self.times.items()}
+            result['times']['search'] = round(self.elapsed - sum(self.times.values()), 4)
+        return result
+
+    def __str__(self):
+        return ' '.join(f"{key}={value}" for key, value in self.as_dict().items()
+                        if key != 'times')
+
+
+class CProfileHook:
+    """Wraps searches in cProfile, accumulating stats across all of them.
+
+    The stats are dumped to path, and the top entries printed to stream,
+    once: on close() or at interpreter exit.
+    """
+    def __init__(self, path, sort='cumulative', limit=25, stream=None):
+        self.path = path
+        self.sort = sort
+        self.limit = limit
+        self.stream = stream
+        self.profile = cProfile.Profile()
+        self.searches = 0
+        self._closed = False
+        atexit.register(self.close)
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.searches += 1
+
+    def close(self):
+        if self._closed or not self.searches:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.profile.dump_stats(self.path)
+        if self.stream:
+            print(f"Profile of {self.searches} searches:", file=self.stream)
+            stats = pstats.Stats(self.profile, stream=self.stream)
+            stats.sort_stats(self.sort).print_stats(self.limit)
+
+
+class SamplingProfileHook:
+    """Samples the searching thread's stack on a CPU timer.
+
+    Samples accumulate across searches and are written to path in collapsed
+    stack format (one "frame;frame;frame count" line per stack), which
+    flamegraph tools read directly. Unix only.
+    """
+    def __init__(self, path, interval=0.001):
+        self.path = path
+        self.interval = interval
+        self.samples = Counter()
+        self._previous_handler = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc_info):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        with open(self.path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def make_profile_hook(kind, path):
+    """Build a profile hook by name ('cprofile' or 'sampling')"""
+    if kind == 'cprofile':
+        return CProfileHook(path, stream=sys.stderr)
+    if kind == 'sampling':
+        return SamplingProfileHook(path)
+    raise ValueError(f"Unknown profiler: {kind!r}")
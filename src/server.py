@@ -0,0 +1,414 @@
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from .board import ChessBoard
+from .ai import ChessAI
+from .analysis import move_to_uci, uci_to_move
+from .constants import *
+
+# Longest request line accepted from a client
+MAX_LINE = 64 * 1024
+
+
+def search_move(fen, position_history, color, depth, time_limit):
+    """Pool worker: search a position and return (uci move, score, nodes)"""
+    board = ChessBoard.from_fen(fen)
+    board.position_history = position_history
+    result = ChessAI(color).search(board, depth, time_limit)
+    score = int(max(-MAX_SCORE, min(MAX_SCORE, result.score)))
+    return move_to_uci(result.move), score, result.stats.nodes
+
+
+class EngineBusy(Exception):
+    """Raised when the search queue is full and a request has to be turned away"""
+
+
+class EnginePool:
+    """Runs ChessAI searches in a bounded process pool.
+
+    At most `workers` searches run at once; up to `max_queue` more wait for a
+    slot, and requests beyond that are rejected with EngineBusy instead of
+    piling up. Queue wait and search time are tracked for the stats request.
+    """
+    def __init__(self, workers=2, max_queue=64, depth=AI_DEPTH, time_limit=1.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.depth = depth
+        self.time_limit = time_limit
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self._slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_search = 0.0
+
+    def check_capacity(self):
+        """Raise EngineBusy if a search submitted now would be turned away"""
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise EngineBusy(f"engine queue full ({self.waiting} waiting)")
+
+    async def search(self, board, time_limit=None):
+        self.check_capacity()
+        if time_limit is None or time_limit > self.time_limit:
+            time_limit = self.time_limit
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self.total_wait += started - queued
+        self.max_wait = max(self.max_wait, started - queued)
+
+        # The slot is given back when the worker finishes, not when we stop
+        # waiting for it: a search that outlives the watchdog still occupies
+        # its process, and releasing early would oversubscribe the pool
+        self.running += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = self.executor.submit(
+                search_move, board.to_fen(), list(board.position_history),
+                board.current_turn, self.depth, time_limit)
+        except BaseException:
+            self._search_done(started)
+            raise
+        future.add_done_callback(lambda _: self._call_soon(loop, self._search_done, started))
+
+        # Iterative deepening stops itself at the deadline; the timeout only
+        # guards against a worker that never answers
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), time_limit * 2 + 1)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    @staticmethod
+    def _call_soon(loop, callback, *args):
+        # Runs in the executor's thread; the loop may be gone after shutdown
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass
+
+    def _search_done(self, started):
+        self.running -= 1
+        self.completed += 1
+        self.total_search += time.perf_counter() - started
+        self._slots.release()
+
+    def metrics(self):
+        return {
+            'workers': self.workers,
+            'running': self.running,
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(1000 * self.total_wait / self.completed, 2) if self.completed else 0.0,
+            'max_wait_ms': round(1000 * self.max_wait, 2),
+            'avg_search_ms': round(1000 * self.total_search / self.completed, 2) if self.completed else 0.0
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class GameSession:
+    """One hosted game: the board, which side the engine plays and a lock for its moves"""
+    def __init__(self, game_id, board, engine_color):
+        self.game_id = game_id
+        self.board = board
+        self.engine_color = engine_color
+        self.lock = asyncio.Lock()
+
+    def state(self):
+        board = self.board
+        if board.winner:
+            status, result = 'checkmate', '1-0' if board.winner == 'White' else '0-1'
+        elif board.game_over:
+            status, result = board.draw_reason, '1/2-1/2'
+        else:
+            status, result = 'ongoing', '*'
+        legal = [] if board.game_over else [move_to_uci(move) for move in board.get_status().moves()]
+        return {'game': self.game_id, 'fen': board.to_fen(), 'turn': board.current_turn,
+                'status': status, 'result': result, 'check': board.in_check[board.current_turn],
+                'legal': legal}
+
+
+class RequestError(Exception):
+    pass
+
+
+# JSON types of request fields, by the name used in error messages
+FIELD_TYPES = {'string': str, 'integer': int, 'number': (int, float)}
+
+
+def _field(request, name, kind, default=None):
+    """Fetch a request field, rejecting values of the wrong JSON type (null counts as absent)"""
+    value = request.get(name)
+    if value is None:
+        return default
+    # bool is an int to Python but not a number to a client
+    if isinstance(value, bool) or not isinstance(value, FIELD_TYPES[kind]):
+        raise RequestError(f"{name} must be {'an' if kind[0] in 'aeiou' else 'a'} {kind}")
+    return value
+
+
+def _time_limit(request):
+    time_limit = _field(request, 'time', 'number')
+    if time_limit is not None and not time_limit > 0:
+        raise RequestError("time must be positive")
+    return time_limit
+
+
+def _check_position(board):
+    """Reject set-ups the engine cannot play from"""
+    for color in ('white', 'black'):
+        kings = sum(1 for row in board.board for piece in row
+                    if piece and piece.piece_type == 'king' and piece.color == color)
+        if kings != 1:
+            raise RequestError(f"position must have one {color} king")
+    if any(piece and piece.piece_type == 'pawn' for piece in board.board[0] + board.board[7]):
+        raise RequestError("position has a pawn on the first or last rank")
+    waiting = 'black' if board.current_turn == 'white' else 'white'
+    if board.in_check[waiting]:
+        raise RequestError(f"{waiting} is in check but it is {board.current_turn} to move")
+
+
+class GameServer:
+    """Hosts many games over a JSON-lines protocol.
+
+    Every request is one JSON object per line with an "op" and an optional
+    "id" echoed back in the reply:
+
+        new    {"color": "white", "fen": ...}  start a game, the client plays color
+        move   {"game": 1, "move": "e2e4"}     play a move; the engine replies in turn
+        go     {"game": 1}                     ask the engine to move (e.g. after a timeout)
+        state  {"game": 1}                     position, status and legal moves
+        close  {"game": 1}                     drop a game
+        stats  {}                              session and engine queue metrics
+
+    Replies carry "ok": true plus the game state, or "ok": false and "error".
+    Requests on one connection are answered in order; a client reads its
+    reply before the next request is taken, which keeps slow readers from
+    queueing unbounded work.
+    """
+    def __init__(self, pool, max_games=1000):
+        self.pool = pool
+        self.max_games = max_games
+        self.games = {}
+        self._game_ids = itertools.count(1)
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.moves = 0
+        self.started = time.time()
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                reply = await self.handle_line(line)
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def handle_line(self, line):
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get('id')
+            handler = getattr(self, f"op_{request.get('op')}", None)
+            if handler is None:
+                raise RequestError(f"unknown op: {request.get('op')!r}")
+            reply = await handler(request)
+            reply['ok'] = True
+        except (RequestError, EngineBusy, ValueError) as e:
+            self.errors += 1
+            reply = {'ok': False, 'error': str(e)}
+            if isinstance(e, EngineBusy):
+                reply['busy'] = True
+        except asyncio.TimeoutError:
+            self.errors += 1
+            reply = {'ok': False, 'error': "engine search timed out"}
+        except Exception:
+            # A bug behind one request must not take the connection down with it
+            self.errors += 1
+            traceback.print_exc(file=sys.stderr)
+            reply = {'ok': False, 'error': "internal error"}
+        if request_id is not None:
+            reply['id'] = request_id
+        return reply
+
+    def _session(self, request):
+        game_id = _field(request, 'game', 'integer')
+        session = self.games.get(game_id)
+        if session is None:
+            raise RequestError(f"no such game: {game_id!r}")
+        return session
+
+    async def _engine_move(self, session, time_limit=None):
+        """Let the engine answer if the game is still on and it is its turn"""
+        board = session.board
+        if board.game_over or board.current_turn != session.engine_color:
+            return None
+        uci, score, nodes = await self.pool.search(board, time_limit)
+        if uci is None:
+            return None
+        from_pos, to_pos, promotion = uci_to_move(uci)
+        if not board.move_piece(from_pos, to_pos, promotion=promotion or 'queen'):
+            # The worker searched a rebuilt copy of this board; a move it
+            # cannot play here means the two disagree about the position
+            raise RuntimeError(f"engine move {uci} is illegal in {board.to_fen()}")
+        self.moves += 1
+        return {'move': uci, 'score': score, 'nodes': nodes}
+
+    async def op_new(self, request):
+        if len(self.games) >= self.max_games:
+            raise RequestError(f"game limit reached ({self.max_games})")
+        color = _field(request, 'color', 'string', 'white')
+        if color not in ('white', 'black'):
+            raise RequestError(f"invalid color: {color!r}")
+        time_limit = _time_limit(request)
+        board = ChessBoard.from_fen(_field(request, 'fen', 'string', START_FEN))
+        _check_position(board)
+        session = GameSession(next(self._game_ids), board, 'black' if color == 'white' else 'white')
+        # Registered up front so concurrent requests count it against
+        # max_games, and dropped again if the engine's first move fails: the
+        # client never learns the id of a game whose "new" was refused
+        self.games[session.game_id] = session
+        try:
+            async with session.lock:
+                engine = await self._engine_move(session, time_limit)
+        except BaseException:
+            del self.games[session.game_id]
+            raise
+        reply = session.state()
+        if engine:
+            reply['engine'] = engine
+        return reply
+
+    async def op_move(self, request):
+        session = self._session(request)
+        move = _field(request, 'move', 'string', '')
+        time_limit = _time_limit(request)
+        async with session.lock:
+            board = session.board
+            if board.game_over:
+                raise RequestError("game is over")
+            if board.current_turn == session.engine_color:
+                raise RequestError("not your turn")
+            from_pos, to_pos, promotion = uci_to_move(move)
+            if to_pos not in board.get_status().legal_moves.get(from_pos, []):
+                raise RequestError(f"illegal move: {move}")
+            # Turn the move away before playing it if the engine could not reply
+            self.pool.check_capacity()
+            board.move_piece(from_pos, to_pos, promotion=promotion or 'queen')
+            self.moves += 1
+            engine = await self._engine_move(session, time_limit)
+            reply = session.state()
+        if engine:
+            reply['engine'] = engine
+        return reply
+
+    async def op_go(self, request):
+        session = self._session(request)
+        time_limit = _time_limit(request)
+        async with session.lock:
+            engine = await self._engine_move(session, time_limit)
+            reply = session.state()
+        if engine:
+            reply['engine'] = engine
+        return reply
+
+    async def op_state(self, request):
+        return self._session(request).state()
+
+    async def op_close(self, request):
+        session = self._session(request)
+        del self.games[session.game_id]
+        return {'game': session.game_id}
+
+    async def op_stats(self, request):
+        elapsed = time.time() - self.started
+        return {
+            'games': len(self.games),
+            'connections': self.connections,
+            'requests': self.requests,
+            'errors': self.errors,
+            'moves': self.moves,
+            'uptime': round(elapsed, 1),
+            'engine': self.pool.metrics()
+        }
+
+
+async def serve(host='127.0.0.1', port=8765, unix_path=None, workers=2, max_queue=64,
+                depth=AI_DEPTH, time_limit=1.0, max_games=1000):
+    pool = EnginePool(workers, max_queue, depth, time_limit)
+    game_server = GameServer(pool, max_games)
+    if unix_path:
+        server = await asyncio.start_unix_server(game_server.handle_connection, unix_path,
+                                                 limit=MAX_LINE)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(game_server.handle_connection, host, port,
+                                            limit=MAX_LINE)
+        where = f"{host}:{port}"
+    print(f"Serving games on {where} with {workers} engine workers", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host many chess games against ChessAI")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host to listen on")
+    parser.add_argument('-p', '--port', type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('-j', '--workers', type=int, default=2, help="engine worker processes")
+    parser.add_argument('-q', '--max-queue', type=int, default=64,
+                        help="searches allowed to wait for a worker before requests are rejected")
+    parser.add_argument('-d', '--depth', type=int, default=AI_DEPTH, help="engine search depth")
+    parser.add_argument('-t', '--time', type=float, default=1.0,
+                        help="maximum engine time per move in seconds")
+    parser.add_argument('--max-games', type=int, default=1000, help="maximum open games")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.max_queue,
+                          args.depth, args.time, args.max_games))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import json
+import math
+import time
+import numpy as np
+from .packed import PositionStore, PositionWriter, pack_position
+from .batch_eval import MIRROR_SQUARE
+from .analysis import read_epd
+from .board import ChessBoard
+from .pgn import open_pgn, replay_games, MoveEvent, GameEnd
+from .constants import *
+
+# Kings are always on the board for both sides, so their value cancels out
+TUNED_PIECES = ('pawn', 'knight', 'bishop', 'rook', 'queen')
+NUM_FEATURES = len(TUNED_PIECES) * 65
+
+# Game results as stored in the label file (white's score times two)
+RESULT_LABELS = {'1-0': 2, '1/2-1/2': 1, '0-1': 0}
+
+# Positions decoded from the store per batch during feature extraction
+FEATURE_CHUNK = 65536
+
+
+class LabeledWriter:
+    """Write positions to a store file and their game results to a .labels sidecar"""
+    def __init__(self, path):
+        self.positions = PositionWriter(path)
+        self.labels = open(path + '.labels', 'wb')
+        self.count = 0
+
+    def write(self, packed, result):
+        self.positions.write_packed(packed)
+        self.labels.write(bytes([RESULT_LABELS[result]]))
+        self.count += 1
+
+    def close(self):
+        self.positions.close()
+        self.labels.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_labeled(path):
+    """Return (store, results) where results holds white's score as 0, 0.5 or 1"""
+    store = PositionStore(path)
+    results = np.fromfile(path + '.labels', dtype=np.uint8).astype(np.float32) / 2
+    if len(results) != len(store):
+        raise ValueError(f"{path}: {len(store)} positions but {len(results)} labels")
+    return store, results
+
+
+def build_from_pgn(pgn_path, out_path, skip_plies=8):
+    """Label every position after skip_plies with its game's result.
+
+    Only one game's positions are buffered at a time. Returns the count.
+    """
+    with LabeledWriter(out_path) as writer, open_pgn(pgn_path) as f:
+        game_positions = []
+        for event in replay_games(f):
+            if isinstance(event, MoveEvent):
+                if event.ply > skip_plies:
+                    game_positions.append(pack_position(event.board))
+            elif isinstance(event, GameEnd):
+                if event.result in RESULT_LABELS and not event.error:
+                    for packed in game_positions:
+                        writer.write(packed, event.result)
+                game_positions = []
+    return writer.count
+
+
+def build_from_epd(epd_path, out_path):
+    """Convert EPD lines carrying the result in a c9 operation (e.g. c9 "1-0")"""
+    with LabeledWriter(out_path) as writer:
+        for fen, operations in read_epd(epd_path):
+            result = operations.get('c9')
+            if result in RESULT_LABELS:
+                writer.write(pack_position(ChessBoard.from_fen(fen)), result)
+    return writer.count
+
+
+def extract_features(squares):
+    """Compress piece-code arrays into an (N, 30) int16 matrix of feature indices.
+
+    Each entry is code * 64 + square for one non-king piece (unused slots
+    point at the all-zero row of code 0), i.e. the column indices of the
+    sparse one-hot (N, 1024) piece/square matrix.
+    """
+    squares = np.asarray(squares, dtype=np.int16)
+    indices = squares * 64 + np.arange(64, dtype=np.int16)
+    # Kings carry no tunable weight, so they are dropped with the empty squares
+    unused = (squares == 0) | ((squares & 7) == PIECE_CODES['king'])
+    # Stable sort moves the tuned pieces to the front of each row
+    order = np.argsort(unused, axis=1, kind='stable')[:, :30]
+    indices = np.take_along_axis(indices, order, axis=1)
+    indices[np.take_along_axis(unused, order, axis=1)] = 0
+    return indices
+
+
+def build_design_matrix():
+    """Return the (1024, NUM_FEATURES) map from weights to white-relative square scores.
+
+    Row code * 64 + square holds the material and piece-square weights a
+    piece with that code on that square contributes, negated and mirrored
+    for black.
+    """
+    design = np.zeros((16 * 64, NUM_FEATURES), dtype=np.float64)
+    for i, piece_type in enumerate(TUNED_PIECES):
+        code = PIECE_CODES[piece_type]
+        table_start = len(TUNED_PIECES) + i * 64
+        for square in range(64):
+            design[code * 64 + square, i] = 1
+            design[code * 64 + square, table_start + square] = 1
+            black_row = (code | BLACK_PIECE_FLAG) * 64 + square
+            design[black_row, i] = -1
+            design[black_row, table_start + MIRROR_SQUARE[square]] = -1
+    return design
+
+
+def weights_to_vector(piece_values=PIECE_VALUES, tables=PIECE_SQUARE_TABLES):
+    vector = np.zeros(NUM_FEATURES, dtype=np.float64)
+    for i, piece_type in enumerate(TUNED_PIECES):
+        vector[i] = piece_values[piece_type]
+        table_start = len(TUNED_PIECES) + i * 64
+        vector[table_start:table_start + 64] = np.asarray(tables[piece_type]).reshape(64)
+    return vector
+
+
+def vector_to_weights(vector):
+    """Round a weight vector into the JSON layout ChessAI.load_weights reads"""
+    vector = np.rint(vector).astype(int)
+    piece_values = {}
+    tables = {}
+    for i, piece_type in enumerate(TUNED_PIECES):
+        piece_values[piece_type] = int(vector[i])
+        table_start = len(TUNED_PIECES) + i * 64
+        tables[piece_type] = vector[table_start:table_start + 64].reshape(8, 8).tolist()
+    return {'piece_values': piece_values, 'tables': tables}
+
+
+class TexelTuner:
+    """Fit evaluation weights to game results by minimizing Texel's loss.
+
+    The predicted score of a position is sigmoid(k * eval) and the loss is the
+    mean squared error against the result. Evaluations are the product of the
+    sparse position/square matrix (held as feature indices) with the square
+    scores design @ weights, so each iteration is one gather-sum forward and
+    one bincount backward with no per-position Python code.
+    """
+    def __init__(self, features, results, weights=None):
+        # Column-major so each feature slot is a contiguous index vector
+        self.columns = np.ascontiguousarray(np.asarray(features).T, dtype=np.intp)
+        # Drop trailing slots no position uses
+        used = (self.columns != 0).any(axis=1)
+        self.columns = self.columns[:used.nonzero()[0][-1] + 1 if used.any() else 0]
+        self.results = np.asarray(results, dtype=np.float64)
+        self.weights = weights_to_vector() if weights is None else np.array(weights, dtype=np.float64)
+        self.design = build_design_matrix()
+        self.k = math.log(10) / 400
+
+    def evaluate(self, weights=None):
+        """White-relative evaluations of every position for the given weights"""
+        square_scores = self.design @ (self.weights if weights is None else weights)
+        evals = np.zeros(self.columns.shape[1], dtype=np.float64)
+        for column in self.columns:
+            evals += square_scores[column]
+        return evals
+
+    def gradient(self, residual):
+        """Map per-position residuals back onto the weights (the transposed product)"""
+        square_gradient = np.zeros(len(self.design), dtype=np.float64)
+        for column in self.columns:
+            square_gradient += np.bincount(column, weights=residual, minlength=len(self.design))
+        return self.design.T @ square_gradient
+
+    def loss(self, weights=None, k=None):
+        return self._loss_from_evals(self.evaluate(weights), self.k if k is None else k)
+
+    def _loss_from_evals(self, evals, k):
+        predicted = 1 / (1 + np.exp(-k * evals))
+        return float(np.mean((self.results - predicted) ** 2))
+
+    def fit_k(self, low=0.0005, high=0.05, iterations=40):
+        """Pick the sigmoid scale that best fits the current weights (golden section)"""
+        evals = self.evaluate()
+        ratio = (math.sqrt(5) - 1) / 2
+        for _ in range(iterations):
+            a = high - ratio * (high - low)
+            b = low + ratio * (high - low)
+            if self._loss_from_evals(evals, a) < self._loss_from_evals(evals, b):
+                high = b
+            else:
+                low = a
+        self.k = (low + high) / 2
+        return self.k
+
+    def tune(self, iterations=500, learning_rate=1.0, log_every=50):
+        """Optimize the weights with Adam and return the final loss"""
+        m = np.zeros_like(self.weights)
+        v = np.zeros_like(self.weights)
+        beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+
+        for step in range(1, iterations + 1):
+            evals = self.evaluate()
+            predicted = 1 / (1 + np.exp(-self.k * evals))
+            residual = (predicted - self.results) * predicted * (1 - predicted)
+            gradient = self.gradient(residual) * (2 * self.k / len(self.results))
+
+            m = beta1 * m + (1 - beta1) * gradient
+            v = beta2 * v + (1 - beta2) * gradient ** 2
+            m_hat = m / (1 - beta1 ** step)
+            v_hat = v / (1 - beta2 ** step)
+            self.weights -= learning_rate * m_hat / (np.sqrt(v_hat) + epsilon)
+
+            if log_every and step % log_every == 0:
+                print(f"iteration {step}: loss {self._loss_from_evals(evals, self.k):.6f}")
+
+        return self.loss()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Texel-style tuning of evaluation weights")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="build a labeled position set")
+    build.add_argument('source', help="PGN (.pgn, .pgn.gz) or EPD file with c9 results")
+    build.add_argument('output', help="output position store")
+    build.add_argument('--skip-plies', type=int, default=8, help="opening plies to skip per game")
+
+    tune = subparsers.add_parser('tune', help="tune weights on a labeled position set")
+    tune.add_argument('dataset', help="labeled position store")
+    tune.add_argument('-o', '--output', default='weights.json', help="output weights file")
+    tune.add_argument('-n', '--iterations', type=int, default=500)
+    tune.add_argument('--learning-rate', type=float, default=1.0)
+
+    args = parser.parse_args(argv)
+    start = time.time()
+
+    if args.command == 'build':
+        if args.source.endswith('.epd'):
+            count = build_from_epd(args.source, args.output)
+        else:
+            count = build_from_pgn(args.source, args.output, args.skip_plies)
+        print(f"Wrote {count} labeled positions in {time.time() - start:.1f}s")
+        return
+
+    store, results = load_labeled(args.dataset)
+    features = np.concatenate([extract_features(store.squares(i, i + FEATURE_CHUNK))
+                               for i in range(0, len(store), FEATURE_CHUNK)] or
+                              [np.zeros((0, 30), np.int16)])
+    tuner = TexelTuner(features, results)
+    print(f"Loaded {len(store)} positions in {time.time() - start:.1f}s")
+    print(f"k = {tuner.fit_k():.6f}, initial loss {tuner.loss():.6f}")
+    final_loss = tuner.tune(args.iterations, args.learning_rate)
+    print(f"Final loss {final_loss:.6f} after {time.time() - start:.1f}s")
+
+    with open(args.output, 'w') as f:
+        json.dump(vector_to_weights(tuner.weights), f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -67,8 +67,11 @@ class ChessUI:
                         (0, 0, WINDOW_SIZE, BANNER_HEIGHT))
         
         font = pygame.font.Font(None, 72)
-        winner = "White" if chess_board.current_turn == 'black' else "Black"
-        text = font.render(f"Checkmate! {winner} wins!", True, BANNER_TEXT_COLOR)
+        if chess_board.winner:
+            message = f"Checkmate! {chess_board.winner} wins!"
+        else:
+            message = f"Draw by {chess_board.draw_reason}!"
+        text = font.render(message, True, BANNER_TEXT_COLOR)
         text_rect = text.get_rect(center=(WINDOW_SIZE//2, BANNER_HEIGHT//2))
         
         self.screen.blit(banner_surface, 
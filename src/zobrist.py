@@ -0,0 +1,62 @@
+import random
+from .constants import *
+
+# Fixed seed so hashes are stable across processes and runs (persistent caches
+# and pool workers rely on this)
+_rng = random.Random(0x5EED_C4E55)
+
+# PIECE_KEYS[piece code][square], indexed like the packed position codes
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in range(16)]
+BLACK_TO_MOVE_KEY = _rng.getrandbits(64)
+CASTLING_KEYS = {char: _rng.getrandbits(64) for char, _, _ in CASTLING_SQUARES}
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+PAWN_KEYS = {'white': PIECE_KEYS[PIECE_CODES['pawn']],
+             'black': PIECE_KEYS[PIECE_CODES['pawn'] | BLACK_PIECE_FLAG]}
+
+
+def piece_code(piece):
+    code = PIECE_CODES[piece.piece_type]
+    return code | BLACK_PIECE_FLAG if piece.color == 'black' else code
+
+
+def hash_board(board):
+    """Return the 64-bit Zobrist key of a ChessBoard position.
+
+    The key covers piece placement, side to move, castling rights and the
+    en passant file.
+    """
+    key = 0
+    grid = board.board
+    for row in range(8):
+        for col in range(8):
+            piece = grid[row][col]
+            if piece:
+                key ^= PIECE_KEYS[piece_code(piece)][row * 8 + col]
+
+    if board.current_turn == 'black':
+        key ^= BLACK_TO_MOVE_KEY
+    for char in board.get_castling_rights():
+        key ^= CASTLING_KEYS[char]
+    if board.last_double_pawn:
+        key ^= EN_PASSANT_KEYS[board.last_double_pawn[1]]
+    return key
+
+
+def is_repetition(history, halfmove_clock, count=3):
+    """Whether the last key in history has occurred count times.
+
+    Only positions since the last pawn move or capture can repeat, so the
+    scan stops halfmove_clock plies back and only visits positions with the
+    same side to move.
+    """
+    if not history:
+        return False
+    key = history[-1]
+    occurrences = 1
+    stop = max(len(history) - 1 - halfmove_clock, 0)
+    for index in range(len(history) - 3, stop - 1, -2):
+        if history[index] == key:
+            occurrences += 1
+            if occurrences >= count:
+                return True
+    return False
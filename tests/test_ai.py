@@ -0,0 +1,93 @@
+import random
+import pytest
+from src.board import ChessBoard
+from src.ai import ChessAI
+from src.analysis import uci_to_move
+from src.search_cache import SearchCache
+from src.zobrist import hash_board
+from src.constants import START_FEN
+
+
+def make_ai(board):
+    ai = ChessAI(board.current_turn)
+    ai.cache = None
+    ai.bitbases = None
+    return ai
+
+
+def exhaustive_scores(board, depth):
+    """Score every root move with its own full window and an empty table"""
+    ai = make_ai(board)
+    ai._start_search(board)
+    scores = []
+    for move in board.get_status().moves():
+        ai.tt = {}
+        scores.append(ai._search_child(board, move, depth - 1, float('-inf'), float('inf'), False))
+    return sorted(scores, reverse=True)
+
+
+@pytest.mark.parametrize('fen, depth', [
+    # Back-rank mate: every later root move used to be searched with an empty window
+    ('6k1/5ppp/8/8/8/8/5PPP/1R4K1 w - - 0 1', 3),
+    (START_FEN, 2),
+    ('r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5', 2),
+    ('8/5pk1/6p1/8/1r5P/6P1/5PK1/R7 w - - 0 40', 3),
+])
+@pytest.mark.parametrize('seed', range(4))
+def test_multipv_matches_exhaustive_root_search(fen, depth, seed):
+    board = ChessBoard.from_fen(fen)
+    expected = exhaustive_scores(board, depth)[:4]
+    random.seed(seed)
+    lines = make_ai(board).search_multipv(board, 4, depth)
+    assert [line.score for line in lines] == expected
+    assert len({line.move for line in lines}) == len(lines)
+
+
+def play(board, *moves):
+    for uci in moves:
+        from_pos, to_pos, promotion = uci_to_move(uci)
+        assert board.move_piece(from_pos, to_pos, promotion=promotion or 'queen')
+    return board
+
+
+def cached_ai(board, tmp_path):
+    """An AI whose cache says a2a3 at depth 10 for the start position"""
+    ai = make_ai(board)
+    ai.cache = SearchCache(str(tmp_path / 'cache.bin'), max_bytes=64 * 1024)
+    ai.cache.store(hash_board(ChessBoard()), 10, 0, ((6, 0), (5, 0)))
+    return ai
+
+
+def test_cache_hit_without_repetition(tmp_path):
+    board = ChessBoard()
+    ai = cached_ai(board, tmp_path)
+    result = ai.search(board, 2)
+    assert ai.last_stats.cache_hit
+    assert result.move == ((6, 0), (5, 0))
+
+
+@pytest.mark.parametrize('moves, halfmove_clock', [
+    # The start position comes round again, so a second return would be a draw
+    (('g1f3', 'g8f6', 'f3g1', 'f6g8'), None),
+    # The fifty-move rule could end the game inside the search
+    ((), 99),
+])
+def test_cache_skipped_when_game_path_matters(tmp_path, moves, halfmove_clock):
+    board = play(ChessBoard(), *moves)
+    if halfmove_clock is not None:
+        board.halfmove_clock = halfmove_clock
+    ai = cached_ai(board, tmp_path)
+    stores = ai.cache.stores
+    ai.search(board, 3)
+    assert not ai.last_stats.cache_hit
+    assert ai.cache.stores == stores
+
+
+def test_cache_not_written_after_draw_cutoff(tmp_path):
+    # Shuffling the knight and king back lets the search reach the start position again
+    board = play(ChessBoard.from_fen('4k3/pp6/8/8/8/8/PP6/4K1N1 w - - 0 1'), 'g1f3', 'e8d8')
+    ai = make_ai(board)
+    ai.cache = SearchCache(str(tmp_path / 'cache.bin'), max_bytes=64 * 1024)
+    ai.search(board, 4)
+    assert ai.last_stats.draw_cutoffs > 0
+    assert ai.cache.stores == 0
@@ -0,0 +1,19 @@
+import io
+import json
+from src.analysis import analyze_epd
+
+
+def test_bad_lines_do_not_stop_a_batch(tmp_path, capsys):
+    path = tmp_path / 'positions.epd'
+    path.write_text('4k3/8/8/8/8/8/8/4K2R w K - id "a";\n'
+                    'garbage line\n'
+                    '4k3/8/8/3nP3/8/8/8/4K3 w - d6 id "bad";\n'
+                    '4k3/8/8/8/8/8/8/4K2Q w - - id "c";\n')
+    output = io.StringIO()
+    assert analyze_epd(str(path), output, depth=1) == 3
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record['id'] for record in records] == ['a', 'bad', 'c']
+    assert 'error' in records[1] and 'move' not in records[1]
+    assert records[0]['move'] and records[2]['move']
+    assert f"{path}:2:" in capsys.readouterr().err
@@ -0,0 +1,41 @@
+import json
+import random
+import numpy as np
+import pytest
+from src.board import ChessBoard
+from src.ai import ChessAI
+from src.batch_eval import BatchEvaluator, board_squares
+
+
+def random_positions(seed, count=20, max_plies=40):
+    """Boards reached by random legal moves from the start position"""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        board = ChessBoard()
+        for _ in range(rng.randrange(max_plies)):
+            moves = board.get_status().moves()
+            if board.game_over or not moves:
+                break
+            board.move_piece(*rng.choice(moves))
+        positions.append(board)
+    return positions
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_batch_scores_match_scalar_evaluation(seed):
+    boards = random_positions(seed)
+    squares = np.array([board_squares(board) for board in boards])
+    evaluator = BatchEvaluator()
+    for color in ('white', 'black'):
+        ai = ChessAI(color)
+        ai.bitbases = None
+        expected = [ai.evaluate_position(board) for board in boards]
+        assert evaluator.evaluate(squares, color).tolist() == expected
+
+
+def test_pawn_structure_weights_switch_the_terms_on(tmp_path):
+    path = tmp_path / 'weights.json'
+    path.write_text(json.dumps({'pawn_structure': {}}))
+    assert ChessAI('white').pawn_structure is False
+    assert ChessAI('white', weights_path=str(path)).pawn_structure is True
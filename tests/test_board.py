@@ -0,0 +1,44 @@
+import pytest
+from src.board import ChessBoard
+
+
+@pytest.mark.parametrize('fen', [
+    '4k3/8/8/8/8/8/8/n3K2R w K - 0 1',
+    '4k3/8/8/8/8/8/8/N3K2R w K - 0 1',
+    '4k3/8/8/8/8/8/8/Q3K2R w KQ - 0 1',
+])
+def test_only_a_rook_on_the_corner_allows_castling(fen):
+    board = ChessBoard.from_fen(fen)
+    moves = board.get_status().moves()
+    assert ((7, 4), (7, 2)) not in moves
+    assert ((7, 4), (7, 6)) in moves
+    assert not board.validator.is_valid_move((7, 4), (7, 2))
+    assert board.to_fen().split()[2] == 'K'
+
+
+@pytest.mark.parametrize('fen', [
+    'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1',
+    '4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1',
+    '4k3/8/8/8/3Pp3/8/8/4K3 b - d3 0 1',
+])
+def test_en_passant_field_round_trips(fen):
+    assert ChessBoard.from_fen(fen).to_fen() == fen
+
+
+@pytest.mark.parametrize('fen', [
+    # A knight, not a pawn, stands in front of the target
+    '4k3/8/8/3nP3/8/8/8/4K3 w - d6 0 1',
+    # Target rank belongs to the side to move
+    '4k3/8/8/8/3Pp3/8/8/4K3 w - d3 0 1',
+    # The pawn is white's own
+    '4k3/8/8/3PP3/8/8/8/4K3 w - d6 0 1',
+    # Target square occupied
+    '4k3/8/3n4/3pP3/8/8/8/4K3 w - d6 0 1',
+    # The square the pawn came from is occupied
+    '4k3/3n4/8/3pP3/8/8/8/4K3 w - d6 0 1',
+    # Not a square at all
+    '4k3/8/8/3pP3/8/8/8/4K3 w - e 0 1',
+])
+def test_invalid_en_passant_field_is_rejected(fen):
+    with pytest.raises(ValueError):
+        ChessBoard.from_fen(fen)
@@ -0,0 +1,90 @@
+import io
+import json
+from src.board import ChessBoard
+from src.events import PgnWriter, JsonLinesWriter, ConsoleSink
+from src.pgn import replay_games, MoveEvent, GameEnd
+from src.analysis import uci_to_move
+from src.constants import START_FEN
+
+
+def play(board, *moves):
+    for text in moves:
+        from_pos, to_pos, promotion = uci_to_move(text)
+        assert board.move_piece(from_pos, to_pos, promotion=promotion or 'queen')
+
+
+def replay(pgn_text):
+    events = list(replay_games(io.BytesIO(pgn_text.encode())))
+    end = [event for event in events if isinstance(event, GameEnd)][0]
+    assert end.error is None
+    return [event.san for event in events if isinstance(event, MoveEvent)]
+
+
+def test_pgn_drops_taken_back_moves():
+    board = ChessBoard.from_fen(START_FEN)
+    output = io.StringIO()
+    writer = PgnWriter(output)
+    board.add_observer(writer)
+
+    play(board, 'e2e4', 'e7e5', 'g1f3', 'b8c6')
+    assert board.takeback()
+    play(board, 'f1c4', 'g8f6')
+    writer.close()
+
+    assert replay(output.getvalue()) == ['e4', 'e5', 'Bc4', 'Nf6']
+
+
+def test_pgn_follows_redo_and_seeking():
+    board = ChessBoard.from_fen(START_FEN)
+    output = io.StringIO()
+    writer = PgnWriter(output)
+    board.add_observer(writer)
+
+    play(board, 'd2d4', 'd7d5', 'c2c4', 'e7e6')
+    board.goto_ply(1)
+    board.redo_move()
+    board.goto_ply(3)
+    play(board, 'g8f6')
+    writer.close()
+
+    assert replay(output.getvalue()) == ['d4', 'd5', 'c4', 'Nf6']
+
+
+def test_streaming_sinks_report_takebacks():
+    board = ChessBoard.from_fen(START_FEN)
+    lines = io.StringIO()
+    console = io.StringIO()
+    board.add_observer(JsonLinesWriter(lines))
+    board.add_observer(ConsoleSink(console))
+
+    play(board, 'e2e4', 'e7e5')
+    board.undo_move()
+    events = [json.loads(line) for line in lines.getvalue().splitlines()]
+    assert events[-1] == {'type': 'reset', 'ply': 1, 'fen': board.to_fen(), 'moves': ['e2e4']}
+    assert '(back after 1.e4)' in console.getvalue()
+
+
+def test_pgn_of_a_game_from_fen_replays():
+    fen = 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 2 2'
+    board = ChessBoard.from_fen(fen)
+    output = io.StringIO()
+    writer = PgnWriter(output)
+    board.add_observer(writer)
+
+    play(board, 'g8f6', 'f1c4', 'f8c5')
+    writer.close()
+
+    pgn = output.getvalue()
+    assert '[SetUp "1"]' in pgn and f'[FEN "{fen}"]' in pgn
+    assert '2... Nf6 3. Bc4 Bc5' in pgn
+    assert replay(pgn) == ['Nf6', 'Bc4', 'Bc5']
+
+
+def test_pgn_from_start_has_no_setup_headers():
+    board = ChessBoard.from_fen(START_FEN)
+    output = io.StringIO()
+    writer = PgnWriter(output)
+    board.add_observer(writer)
+    play(board, 'e2e4')
+    writer.close()
+    assert 'SetUp' not in output.getvalue() and 'FEN' not in output.getvalue()
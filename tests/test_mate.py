@@ -0,0 +1,22 @@
+from src.board import ChessBoard
+from src.mate import MateSolver
+
+
+def solve(fen, max_moves):
+    board = ChessBoard.from_fen(fen)
+    solver = MateSolver(board.current_turn)
+    solver.bitbases = None
+    return solver, solver.solve(board, max_moves)
+
+
+def test_solver_reports_the_search_stats():
+    solver, result = solve('6k1/5ppp/8/8/8/8/5PPP/1R4K1 w - - 0 1', 2)
+    assert result.mate_in == 1 and len(result.line) == 1
+    assert result.nodes == solver.last_stats.nodes > 0
+    assert result.elapsed == solver.last_stats.elapsed > 0
+
+
+def test_no_mate_within_the_limit():
+    solver, result = solve('7k/8/8/8/8/8/4K3/6Q1 w - - 0 1', 1)
+    assert result.mate_in is None and result.line == []
+    assert result.elapsed == solver.last_stats.elapsed > 0
@@ -0,0 +1,27 @@
+import pytest
+from src.board import ChessBoard
+from src.ai import ChessAI
+from src.constants import START_FEN
+
+
+def perft(board, depth, ai):
+    moves = board.get_status().moves()
+    if depth == 1:
+        return len(moves)
+    return sum(perft(ai.simulate_move(board, move), depth - 1, ai) for move in moves)
+
+
+@pytest.mark.parametrize('fen, depth, nodes', [
+    (START_FEN, 3, 8902),
+    # Position 3 from the standard perft suite: en passant can expose the king along a rank
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', 3, 2812),
+])
+def test_perft(fen, depth, nodes):
+    board = ChessBoard.from_fen(fen)
+    assert perft(board, depth, ChessAI(board.current_turn)) == nodes
+
+
+def test_en_passant_exposing_king_on_rank_is_illegal():
+    # fxg3 e.p. would clear both pawns off the fourth rank, leaving h4 in check from b4
+    board = ChessBoard.from_fen('8/8/8/KP5r/1R3pPk/8/4P3/8 b - g3 0 1')
+    assert ((4, 5), (5, 6)) not in board.get_status().moves()
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import pytest
+from src.analysis import uci_to_move
+from src.board import ChessBoard
+from src.server import EnginePool, GameServer
+
+
+@pytest.fixture
+def server():
+    pool = EnginePool(workers=1, max_queue=4, depth=1, time_limit=0.5)
+    yield GameServer(pool, max_games=2)
+    pool.close()
+
+
+def request(server, line):
+    if not isinstance(line, (str, bytes)):
+        line = json.dumps(line)
+    return asyncio.run(server.handle_line(line))
+
+
+def test_refused_new_game_is_not_kept(server):
+    # With no queue the engine turns every search away
+    server.pool.max_queue = 0
+    for _ in range(3):
+        reply = request(server, {'op': 'new', 'color': 'black'})
+        assert reply['ok'] is False and reply['busy'] is True
+    assert server.games == {}
+
+    server.pool.max_queue = 4
+    reply = request(server, {'op': 'new', 'color': 'white'})
+    assert reply['ok'] is True and list(server.games) == [reply['game']]
+
+
+@pytest.mark.parametrize('line, error', [
+    ({'op': 'new', 'fen': '4k3/8/8/8/8/8/8/4K3 w - e 0 1'}, "en passant"),
+    ({'op': 'new', 'fen': 5}, "fen must be a string"),
+    ({'op': 'new', 'fen': '8/8/8/8/8/8/8/4K3 w - - 0 1'}, "one black king"),
+    ({'op': 'new', 'fen': '4k3/8/8/8/8/8/8/r3K3 b - - 0 1'}, "white is in check"),
+    ({'op': 'new', 'color': 1}, "color must be a string"),
+    ({'op': 'new', 'time': 'fast'}, "time must be a number"),
+    ({'op': 'new', 'time': -1}, "time must be positive"),
+    ({'op': 'state', 'game': [1]}, "game must be an integer"),
+    ({'op': 'state', 'game': '1'}, "game must be an integer"),
+    ({'op': 'move', 'game': 1, 'move': 52}, "move must be a string"),
+    ({'op': 'move', 'game': 1, 'move': 'e2e4', 'time': True}, "time must be a number"),
+    ({'op': 'move', 'game': 1, 'move': 'e2'}, "Invalid move"),
+    ('[1, 2]', "JSON object"),
+    ('{"op": "new"', "Expecting"),
+])
+def test_malformed_request_gets_error_reply(server, line, error):
+    request(server, {'op': 'new', 'color': 'white'})
+    reply = request(server, line)
+    assert reply['ok'] is False
+    assert error in reply['error']
+    # The game from the first request is still usable afterwards
+    assert request(server, {'op': 'state', 'game': 1})['ok'] is True
+
+
+def test_engine_replies_through_the_pool(server):
+    reply = request(server, {'op': 'new', 'color': 'white'})
+    assert reply['ok'] is True
+    game = reply['game']
+
+    reply = request(server, {'op': 'move', 'game': game, 'move': 'e2e4', 'id': 7})
+    assert reply['ok'] is True and reply['id'] == 7
+    assert reply['turn'] == 'white'
+    engine = reply['engine']
+    assert engine['nodes'] > 0
+    # The engine's reply is legal and was played on the hosted board
+    board = ChessBoard()
+    for uci in ('e2e4', engine['move']):
+        from_pos, to_pos, promotion = uci_to_move(uci)
+        assert board.move_piece(from_pos, to_pos, promotion=promotion or 'queen')
+    assert reply['fen'] == board.to_fen()
+    assert server.moves == 2 and server.pool.completed == 1
+
+
+def test_engine_move_the_server_cannot_play_is_an_error(server):
+    async def bad_search(board, time_limit=None):
+        return 'e2e5', 0, 1
+    server.pool.search = bad_search
+
+    reply = request(server, {'op': 'new', 'color': 'black'})
+    assert reply['ok'] is False and reply['error'] == 'internal error'
+    assert server.moves == 0 and server.games == {}